@@ -7,16 +7,23 @@ for a given input ZIP code.  Expensive calls are executed concurrently and
 repetitive queries are rate limited.
 """
 
-from fastapi import APIRouter, Request, HTTPException, Response
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, Request, HTTPException, Response
+from typing import Dict, Any, Optional, Tuple, Union
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import ipaddress
+import itertools
 import os
+import re
 import time
-import math
-import hashlib
-import json
 
-from utils.geocode import get_coordinates_from_zip
+import numpy as np
+import redis
+from cachetools import LRUCache
+
+from utils.geocode import get_coordinates_from_zip, lookup_coordinates_from_zip
 from utils.airnow import get_aqi_by_zip
 from utils.landcover import get_canopy_and_pavement
 from utils.trees import normalize_canopy
@@ -24,18 +31,79 @@ from utils.pavement import normalize_pavement
 from utils.sea_level import get_sea_level_rise_score
 from utils.transit import get_transit_access_score
 from utils.water import get_water_score
+from utils.osm_counts import batch_scores
 from utils.flood_risk import get_flood_risk as get_rtfi_flood_risk
 from utils.traffic import get_traffic_score
 from utils.greenspace import get_green_space
 from utils.toxics import get_toxic_sites
 from utils.demographics import get_demographics
-from utils.kv import cache_get_zip, cache_set_zip
+from utils.kv import r, cache_get_zip_with_etag, cache_set_zip, acquire_zip_lock, release_zip_lock, zip_lock_held
 
 router = APIRouter()
 
-# Simple rate limiter per client IP
+# One long-lived pool for the blocking utility calls, shared by every request
+# (and installed as the loop's default executor at startup).
+GS_WORKERS = int(os.getenv("GS_WORKERS", "16"))
+SHARED_EXECUTOR = ThreadPoolExecutor(max_workers=GS_WORKERS, thread_name_prefix="gs")
+# Budget for the slowest metric; anything still running is reported as an error.
+PER_METRIC_TIMEOUT_S = float(os.getenv("GS_METRIC_TIMEOUT_S", "120"))
+
+# Per-client-IP rate limit: sliding 60s log in a Redis sorted set so it holds
+# across workers; a bounded in-process log takes over if Redis is down.
 RATE_LIMIT_PER_MIN = int(os.getenv("RATE_LIMIT_PER_MIN", "30"))
-_request_log: Dict[str, list] = {}
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "16384"))
+_local_hits: LRUCache = LRUCache(maxsize=RATE_LIMIT_MAX_CLIENTS)
+_rl_seq = itertools.count()  # keeps same-timestamp ZSET members distinct
+
+
+def _ip_key(ip: str) -> Union[int, str]:
+    """Pack an IPv4/IPv6 address into an int (far smaller than the str); keep anything else as-is."""
+    try:
+        return int(ipaddress.ip_address(ip))
+    except ValueError:
+        return ip
+
+
+def _check_rate_limit_local(ip: str, now: float) -> bool:
+    """In-process fallback: per-IP deque of call times in an LRU bounded by RATE_LIMIT_MAX_CLIENTS."""
+    ip_key = _ip_key(ip)
+    dq = _local_hits.get(ip_key)
+    if dq is None:
+        dq = deque(maxlen=RATE_LIMIT_PER_MIN)
+    while dq and now - dq[0] >= 60:
+        dq.popleft()
+    if len(dq) >= RATE_LIMIT_PER_MIN:
+        return False
+    dq.append(now)
+    _local_hits[ip_key] = dq
+    return True
+
+
+def _check_rate_limit(ip: str) -> bool:
+    """Return True if ``ip`` has made fewer than RATE_LIMIT_PER_MIN requests in the last 60s."""
+    now = time.time()
+    key = f"rl:{ip}"
+    member = f"{now:.6f}:{next(_rl_seq)}"
+    try:
+        pipe = r.pipeline()
+        pipe.zremrangebyscore(key, 0, now - 60)
+        pipe.zadd(key, {member: now})
+        pipe.zcard(key)
+        pipe.expire(key, 70)
+        _, _, count, _ = pipe.execute()
+        if count > RATE_LIMIT_PER_MIN:
+            # Rejected calls don't occupy the window, so a flood can't grow the set.
+            r.zrem(key, member)
+            return False
+    except redis.exceptions.RedisError:
+        return _check_rate_limit_local(ip, now)
+    return True
+
+
+def _client_ip(request: Request) -> str:
+    """First X-Forwarded-For hop if present, else the socket peer."""
+    return (request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+            or (request.client.host if request.client else "unknown"))
 
 
 async def rate_limiter(request: Request):
@@ -43,18 +111,13 @@ async def rate_limiter(request: Request):
     Limit the number of requests from a single client per minute.
 
     Raise HTTPException with status 429 if the client has exceeded
-    RATE_LIMIT_PER_MIN requests within the last 60 seconds.
+    RATE_LIMIT_PER_MIN requests within the last 60 seconds.  Declared
+    ``async`` so FastAPI runs it on the loop instead of the threadpool;
+    the blocking Redis round-trip goes to the shared executor.
     """
-    client_ip = request.client.host if request.client else "unknown"
-    now = time.time()
-
-    calls = _request_log.get(client_ip, [])
-    calls = [t for t in calls if now - t < 60]
-    if len(calls) >= RATE_LIMIT_PER_MIN:
+    allowed = await asyncio.get_running_loop().run_in_executor(SHARED_EXECUTOR, _check_rate_limit, _client_ip(request))
+    if not allowed:
         raise HTTPException(status_code=429, detail="Rate limit exceeded. Try again later.")
-    calls.append(now)
-    _request_log[client_ip] = calls
-    return
 
 METRIC_WEIGHTS = {
     "air_quality":        1.2,
@@ -78,181 +141,164 @@ def _extract_score(v):
         return max(0.0, min(100.0, float(s)))
     return None
 
-def _geometric_mean_over_scores(scores: dict) -> int | None:
+# Metric -> slot index, with weights pre-built in the same order.  Zero
+# weights are dropped here so the hot path needs no extra weight check.
+_METRIC_IDX = {k: i for i, k in enumerate(k for k, w in METRIC_WEIGHTS.items() if w > 0)}
+_W = np.fromiter((METRIC_WEIGHTS[k] for k in _METRIC_IDX), dtype=np.float64, count=len(_METRIC_IDX))
+_LOG_EPS = 1e-10  # keeps log() finite for zero scores without flooring them
+
+# Power-mean exponent for the overall score: 0 = geometric (default),
+# 1 = arithmetic, -1 = harmonic.
+GS_MEAN_EXPONENT = float(os.getenv("GS_MEAN_EXPONENT", "0"))
+
+def _power_mean(x: np.ndarray, w: np.ndarray, a: float) -> float:
     """
-    Weighted geometric mean over available component scores (0..100).
-    Missing metrics are ignored with weights renormalized.
+    Weighted power mean of ``x`` (values in 0..1), evaluated in the log domain.
+
+    ``a == 0`` is the geometric-mean limit; otherwise the sum of ``w * x**a``
+    is taken with a log-sum-exp so tiny values neither underflow nor need
+    clamping.
     """
+    log_x = np.log(x + _LOG_EPS)
+    if a == 0:
+        return float(np.exp((w / w.sum()) @ log_x))
+    lse = np.logaddexp.reduce(a * log_x + np.log(w))
+    return float(np.exp((lse - np.log(w.sum())) / a))
 
-    triples = []
+def _aggregate_scores(scores: dict, a: float = GS_MEAN_EXPONENT) -> int | None:
+    """
+    Weighted power mean (exponent ``a``) over available component scores (0..100).
+    Missing metrics are ignored with weights renormalized.
+    """
+    s_arr = np.empty(_W.size, dtype=np.float64)
+    mask = np.zeros(_W.size, dtype=bool)
     for k, v in scores.items():
-        s = _extract_score(v)
-        w = METRIC_WEIGHTS.get(k, 0.0)
-        if s is not None and w > 0:
-            s = max(1.0, s)
-            triples.append((k, s, w))
-
-    if not triples:
+        i = _METRIC_IDX.get(k)
+        if i is not None:
+            s = _extract_score(v)
+            if s is not None:
+                mask[i] = True
+                s_arr[i] = s
+    if not mask.any():
         return None
 
-    total_w = sum(w for _, _, w in triples)
-    if total_w <= 0:
-        return None
+    m = 100.0 * _power_mean(s_arr[mask] / 100.0, _W[mask], a)
+    return int(round(min(100.0, max(0.0, m))))
+
+
+def _fmt_air(res: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "score": res.get("score"),
+        "max_aqi": res.get("max_aqi"),
+        "primary_pollutant": res.get("primary_pollutant"),
+        "observations": res.get("observations"),
+        "source": "AirNow"
+    }
 
-    acc = 0.0
-    for _, s, w in triples:
-        acc += (w / total_w) * math.log(s / 100.0)
-    gm = 100.0 * math.exp(acc)
-    return int(round(max(0.0, min(100.0, gm))))
+def _fmt_land(normalize, field: str):
+    def fmt(res: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "score": normalize(res.get(field)),
+            "percentage": res.get(field),
+            "source": res.get("source"),
+            "acquired": res.get("acquired")
+        }
+    return fmt
 
+def _fmt_traffic(res: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "score": res.get("score"),
+        "weighted_road_length": round(res.get("weighted_length", 0.0), 2)
+    }
 
-def compute_green_score(zip: str) -> Dict[str, Any]:
+def _passthrough(res: Dict[str, Any]) -> Dict[str, Any]:
+    return res
+
+# (score key, job key, default error, formatter, extra fields on error), in response order
+_METRIC_HANDLERS = (
+    ("air_quality", "air", "Unknown error", _fmt_air, {"source": "AirNow"}),
+    ("tree_canopy", "land", "Unable to retrieve land cover data", _fmt_land(normalize_canopy, "canopy"), {}),
+    ("pavement", "land", "Unable to retrieve land cover data", _fmt_land(normalize_pavement, "pavement"), {}),
+    ("traffic", "traffic", "Unable to compute traffic score", _fmt_traffic, {}),
+    ("toxic_sites", "toxic", "Unable to retrieve toxic sites", _passthrough, {}),
+    ("green_space", "green", "Unable to retrieve green space", _passthrough, {}),
+    ("demographics", "dem", "Unable to retrieve demographics", _passthrough, {}),
+    ("sea_level_rise", "sea_level", "Unable to compute sea level rise exposure", _passthrough, {}),
+    ("transit_access", "transit", "Unable to compute transit access", _passthrough, {}),
+    ("water_availability", "water", "Unable to compute water availability", _passthrough, {}),
+    ("riverine_flood_risk", "flood_rtfi", "Unable to compute real‑time flood risk", _passthrough, {}),
+)
+
+
+async def compute_green_score(zip: str, coords: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
     """
     Compute green scores for a ZIP code by aggregating multiple environmental metrics.
 
     This helper is called by the `/green-score` endpoint.  It converts the
-    provided ZIP code into geographic coordinates, validates them and then
-    orchestrates concurrent calls to both internal utility modules and
-    externally defined environmental functions.  Each result is placed
-    into a dictionary keyed by the metric name and includes error
-    handling.  Finally, the overall score is computed as the average of
-    available numeric scores (0–100 range).  If no scores are available,
-    the overall score will be ``None``.
+    provided ZIP code into geographic coordinates (unless the caller already
+    resolved them and passes ``coords``), validates them and then
+    fans the blocking utility calls out onto ``SHARED_EXECUTOR`` (the
+    ZIP-only ones start while geocoding is still running), waiting at
+    most ``PER_METRIC_TIMEOUT_S`` for them.  Each result is shaped by its
+    ``_METRIC_HANDLERS`` entry into a dictionary keyed by the metric name,
+    with failures reported as error dicts.  Finally, the overall score is
+    computed as the weighted power mean (geometric by default, see
+    ``GS_MEAN_EXPONENT``) of available numeric scores (0–100 range).  If
+    no scores are available, the overall score will be ``None``.
     """
-    coords = get_coordinates_from_zip(zip)
+    loop = asyncio.get_running_loop()
+    # AirNow and Census only need the ZIP, so they start before (and overlap
+    # with) geocoding; everything else waits for coordinates.
+    futures = {
+        # detail=True: the response still lists the per-station observations
+        loop.run_in_executor(SHARED_EXECUTOR, partial(get_aqi_by_zip, zip, detail=True)): "air",
+        loop.run_in_executor(SHARED_EXECUTOR, get_demographics, zip): "dem",
+    }
+    if coords is None:
+        coords = await loop.run_in_executor(SHARED_EXECUTOR, get_coordinates_from_zip, zip)
     if not coords:
+        for fut in futures:
+            fut.cancel()
         return {"error": "Invalid ZIP code"}
 
+    lat, lon = coords
+    jobs = {
+        "land": (get_canopy_and_pavement, (lat, lon, 0.01)),
+        "traffic": (get_traffic_score, (zip, lat, lon)),
+        "toxic": (get_toxic_sites, (lat, lon)),
+        "green": (get_green_space, (lat, lon)),
+        "sea_level": (get_sea_level_rise_score, (lat, lon)),
+        # transit and water share one Overpass count request
+        "osm_counts": (batch_scores, (lat, lon)),
+        "flood_rtfi": (get_rtfi_flood_risk, (lat, lon)),
+    }
+    futures.update({loop.run_in_executor(SHARED_EXECUTOR, fn, *args): key for key, (fn, args) in jobs.items()})
+    done, pending = await asyncio.wait(futures, timeout=PER_METRIC_TIMEOUT_S)
+
+    results: Dict[str, Any] = {}
+    for fut in done:
+        exc = fut.exception()
+        # A raising utility becomes an error dict so it is reported like any other failure.
+        results[futures[fut]] = {"error": str(exc) or type(exc).__name__} if exc else fut.result()
+    for fut in pending:
+        # The worker thread cannot be interrupted; it finishes in the background
+        # (usually warming its utility's TTL cache) while we report a timeout.
+        fut.cancel()
+        results[futures[fut]] = {"error": f"Timed out after {PER_METRIC_TIMEOUT_S:g}s"}
+    osm = results.pop("osm_counts")
+    for job in ("transit", "water"):
+        results[job] = osm if "error" in osm else osm[job]
+
     scores: Dict[str, Any] = {}
+    for key, job, default_err, fmt, err_extra in _METRIC_HANDLERS:
+        res = results[job]
+        if isinstance(res, dict) and "error" not in res:
+            scores[key] = fmt(res)
+        else:
+            err = res.get("error", default_err) if isinstance(res, dict) else default_err
+            scores[key] = {"error": err, **err_extra}
 
-    # Use a thread pool to parallelize I/O bound operations.  Increase the
-    # worker count to accommodate additional metrics.
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        # Existing metrics
-        fut_air = executor.submit(get_aqi_by_zip, zip)
-        fut_land = executor.submit(get_canopy_and_pavement, coords[0], coords[1], 0.01)
-        fut_traffic = executor.submit(get_traffic_score, zip, coords[0], coords[1])
-        fut_toxic = executor.submit(get_toxic_sites, coords[0], coords[1])
-        fut_green = executor.submit(get_green_space, coords[0], coords[1])
-        fut_dem = executor.submit(get_demographics, zip)
-
-        # New environmental metrics
-        fut_sea_level = executor.submit(get_sea_level_rise_score, coords[0], coords[1])
-        fut_transit = executor.submit(get_transit_access_score, coords[0], coords[1])
-        fut_water = executor.submit(get_water_score, coords[0], coords[1])
-        fut_flood_rtfi = executor.submit(get_rtfi_flood_risk, coords[0], coords[1])
-
-        # Wait for results
-        airnow_result = fut_air.result()
-        land_result = fut_land.result()
-        traffic_result = fut_traffic.result()
-        toxic_result = fut_toxic.result()
-        green_space_result = fut_green.result()
-        demographics_result = fut_dem.result()
-
-        sea_level_result = fut_sea_level.result()
-        transit_result = fut_transit.result()
-        water_result = fut_water.result()
-        flood_rtfi_result = fut_flood_rtfi.result()
-
-    # Air quality
-    if isinstance(airnow_result, dict) and "error" not in airnow_result:
-        scores["air_quality"] = {
-            "score": airnow_result.get("score"),
-            "max_aqi": airnow_result.get("max_aqi"),
-            "primary_pollutant": airnow_result.get("primary_pollutant"),
-            "observations": airnow_result.get("observations"),
-            "source": "AirNow"
-        }
-    else:
-        scores["air_quality"] = {"error": airnow_result.get("error", "Unknown error"), "source": "AirNow"}
-
-    # Land cover (canopy & pavement)
-    if isinstance(land_result, dict) and "error" not in land_result:
-        scores["tree_canopy"] = {
-            "score": normalize_canopy(land_result.get("canopy")),
-            "percentage": land_result.get("canopy"),
-            "source": land_result.get("source"),
-            "acquired": land_result.get("acquired")
-        }
-        scores["pavement"] = {
-            "score": normalize_pavement(land_result.get("pavement")),
-            "percentage": land_result.get("pavement"),
-            "source": land_result.get("source"),
-            "acquired": land_result.get("acquired")
-        }
-    else:
-        err_msg = land_result.get("error", "Unable to retrieve land cover data") if isinstance(land_result, dict) else "Unable to retrieve land cover data"
-        scores["tree_canopy"] = {"error": err_msg}
-        scores["pavement"] = {"error": err_msg}
-
-    # Traffic
-    if isinstance(traffic_result, dict) and "error" not in traffic_result:
-        scores["traffic"] = {
-            "score": traffic_result.get("score"),
-            "weighted_road_length": round(traffic_result.get("weighted_length", 0.0), 2)
-        }
-    else:
-        err = traffic_result.get("error", "Unable to compute traffic score") if isinstance(traffic_result, dict) else "Unable to compute traffic score"
-        scores["traffic"] = {"error": err}
-
-    # Toxic sites
-    if isinstance(toxic_result, dict) and "error" not in toxic_result:
-        scores["toxic_sites"] = toxic_result
-    else:
-        err = toxic_result.get("error", "Unable to retrieve toxic sites") if isinstance(toxic_result, dict) else "Unable to retrieve toxic sites"
-        scores["toxic_sites"] = {"error": err}
-
-    # Green space
-    if isinstance(green_space_result, dict) and "error" not in green_space_result:
-        scores["green_space"] = green_space_result
-    else:
-        err = green_space_result.get("error", "Unable to retrieve green space") if isinstance(green_space_result, dict) else "Unable to retrieve green space"
-        scores["green_space"] = {"error": err}
-
-    # Demographics
-    if isinstance(demographics_result, dict) and "error" not in demographics_result:
-        scores["demographics"] = demographics_result
-    else:
-        err = demographics_result.get("error", "Unable to retrieve demographics") if isinstance(demographics_result, dict) else "Unable to retrieve demographics"
-        scores["demographics"] = {"error": err}
-
-    # New metrics: sea level rise exposure
-    if isinstance(sea_level_result, dict) and "error" not in sea_level_result:
-        scores["sea_level_rise"] = sea_level_result
-    else:
-        err = sea_level_result.get("error", "Unable to compute sea level rise exposure") if isinstance(sea_level_result, dict) else "Unable to compute sea level rise exposure"
-        scores["sea_level_rise"] = {"error": err}
-
-    # Transit access
-    if isinstance(transit_result, dict) and "error" not in transit_result:
-        scores["transit_access"] = transit_result
-    else:
-        err = transit_result.get("error", "Unable to compute transit access") if isinstance(transit_result, dict) else "Unable to compute transit access"
-        scores["transit_access"] = {"error": err}
-
-    # Water availability
-    if isinstance(water_result, dict) and "error" not in water_result:
-        scores["water_availability"] = water_result
-    else:
-        err = water_result.get("error", "Unable to compute water availability") if isinstance(water_result, dict) else "Unable to compute water availability"
-        scores["water_availability"] = {"error": err}
-
-    # Real‑time flood risk (USGS RT‑FI)
-    if isinstance(flood_rtfi_result, dict) and "error" not in flood_rtfi_result:
-        scores["riverine_flood_risk"] = flood_rtfi_result
-    else:
-        err = flood_rtfi_result.get("error", "Unable to compute real‑time flood risk") if isinstance(flood_rtfi_result, dict) else "Unable to compute real‑time flood risk"
-        scores["riverine_flood_risk"] = {"error": err}
-
-    # Compute overall score: average of available numeric scores (0–100)
-    score_values = [
-        v.get("score")
-        for v in scores.values()
-        if isinstance(v, dict) and isinstance(v.get("score"), (int, float))
-    ]
-    # overall_score = round(sum(score_values) / len(score_values)) if score_values else None
-    overall_score = _geometric_mean_over_scores(scores)
+    overall_score = _aggregate_scores(scores)
 
     return {
         "zip": zip,
@@ -261,30 +307,91 @@ def compute_green_score(zip: str) -> Dict[str, Any]:
         "overall_score": overall_score
     }
 
+# Single-flight for cache misses: one fill task per ZIP in this process, and a
+# Redis lease so other workers wait for the cached result instead of recomputing.
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+async def _fill_zip(zip: str, coords: Tuple[float, float]):
+    """
+    Compute and cache one ZIP, or adopt the result a peer worker is computing.
+
+    A worker that finds the lease taken polls the cache for as long as the
+    lease exists (it is sized to outlast a cold compute); if the lease goes
+    away without a cached result, the waiter takes it over and computes.
+
+    Returns the cached ``(body, etag)`` pair on success, otherwise the error
+    dict from ``compute_green_score``.
+    """
+    loop = asyncio.get_running_loop()
+    owned = await loop.run_in_executor(SHARED_EXECUTOR, acquire_zip_lock, zip)
+    delay = 0.25
+    while not owned:
+        # Another worker holds the lease; poll the cache with exponential backoff.
+        await asyncio.sleep(delay)
+        entry = await loop.run_in_executor(SHARED_EXECUTOR, cache_get_zip_with_etag, zip)
+        if entry:
+            return entry
+        if not await loop.run_in_executor(SHARED_EXECUTOR, zip_lock_held, zip):
+            # Peer released (failed) or its lease lapsed; it may have stored
+            # the result just before, otherwise try to take over.
+            entry = await loop.run_in_executor(SHARED_EXECUTOR, cache_get_zip_with_etag, zip)
+            if entry:
+                return entry
+            owned = await loop.run_in_executor(SHARED_EXECUTOR, acquire_zip_lock, zip)
+        delay = min(delay * 2, 2.0)
+    try:
+        result = await compute_green_score(zip, coords)
+        if isinstance(result, dict) and not result.get("error"):
+            return await loop.run_in_executor(SHARED_EXECUTOR, cache_set_zip, zip, result)
+        return result
+    finally:
+        await loop.run_in_executor(SHARED_EXECUTOR, release_zip_lock, zip)
+
+
+_ZIP_RE = re.compile(r"\d{5}")
+
+
+async def _zip_coords(zip: str) -> Tuple[float, float]:
+    """
+    Geocode ``zip`` (LRU-cached).  Malformed or unknown ZIPs are rejected
+    with 400 (malformed ones without a geocoder call); a failed lookup is a
+    503, since the ZIP may well be valid.
+    """
+    if not _ZIP_RE.fullmatch(zip):
+        raise HTTPException(status_code=400, detail="Invalid ZIP code")
+    try:
+        coords = await asyncio.get_running_loop().run_in_executor(SHARED_EXECUTOR, lookup_coordinates_from_zip, zip)
+    except Exception:
+        raise HTTPException(status_code=503, detail="Geocoding service unavailable. Try again later.")
+    if not coords:
+        raise HTTPException(status_code=400, detail="Invalid ZIP code")
+    return coords
+
+
 @router.get("/green-score")
-def green_score(zip: str, request: Request):
+async def green_score(
+    zip: str,
+    request: Request,
+    # Declaration order is resolution order: invalid ZIPs are rejected
+    # before they can spend a rate-limit slot.
+    coords: Tuple[float, float] = Depends(_zip_coords),
+    _limited: None = Depends(rate_limiter),
+):
     """
     Compute or retrieve a green score for the supplied ZIP code.
 
-    This endpoint enforces a simple per-IP rate limit, serves cached responses
+    Unknown ZIPs get a 400 without touching the limiter.  Otherwise the
+    endpoint is rate limited per IP (``rate_limiter``), serves cached responses
     where available, and returns 304 Not Modified when the client presents
     a matching ETag.  Cached responses are annotated with `X-Cache` headers.
     """
-    # simple per-IP rate limiting (sync, uses X-Forwarded-For if present)
-    client_ip = (request.headers.get("x-forwarded-for", "").split(",")[0].strip()
-                 or (request.client.host if request.client else "unknown"))
-    now = time.time()
-    calls = _request_log.get(client_ip, [])
-    calls = [t for t in calls if now - t < 60]
-    if len(calls) >= RATE_LIMIT_PER_MIN:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded. Try again later.")
-    calls.append(now)
-    _request_log[client_ip] = calls
+    loop = asyncio.get_running_loop()
 
-    # Attempt to serve from cache.
-    cached = cache_get_zip(zip)
-    if cached:
-        etag = hashlib.sha256(json.dumps(cached, sort_keys=True).encode('utf-8')).hexdigest()
+    # Attempt to serve from cache; body and ETag were computed when it was stored.
+    entry = await loop.run_in_executor(SHARED_EXECUTOR, cache_get_zip_with_etag, zip)
+    if entry:
+        body, etag = entry
         inm = request.headers.get('if-none-match')
         if inm == etag:
             # Data unchanged since last fetch.
@@ -294,7 +401,7 @@ def green_score(zip: str, request: Request):
                 "X-Cache": "HIT",
             })
         return Response(
-            content=json.dumps(cached),
+            content=body,
             media_type="application/json",
             headers={
                 "ETag": etag,
@@ -303,12 +410,16 @@ def green_score(zip: str, request: Request):
             }
         )
 
-    result = compute_green_score(zip)
-    if isinstance(result, dict) and not result.get("error"):
-        cache_set_zip(zip, result)
-        etag = hashlib.sha256(json.dumps(result, sort_keys=True).encode('utf-8')).hexdigest()
+    # Concurrent misses for the same ZIP share one fill.
+    task = _inflight.get(zip)
+    if task is None:
+        task = _inflight[zip] = asyncio.ensure_future(_fill_zip(zip, coords))
+        task.add_done_callback(lambda _t: _inflight.pop(zip, None))
+    filled = await asyncio.shield(task)
+    if isinstance(filled, tuple):
+        body, etag = filled
         return Response(
-            content=json.dumps(result),
+            content=body,
             media_type="application/json",
             headers={
                 "ETag": etag,
@@ -317,10 +428,10 @@ def green_score(zip: str, request: Request):
             }
         )
     # error: return as-is (dict with error)
-    return result
+    return filled
 
 @router.get("/sea-level")
-def sea_level(zip: str):
+async def sea_level(zip: str):
     """
     Assess sea level rise exposure for a ZIP code.
 
@@ -330,16 +441,16 @@ def sea_level(zip: str):
     indicates no detected inundation within 5 km, while 0 indicates
     all scenarios affect the location.
     """
-    coords = get_coordinates_from_zip(zip)
+    coords = await asyncio.to_thread(get_coordinates_from_zip, zip)
     if not coords:
         return {"error": "Invalid ZIP code"}
     lat, lon = coords
-    result = get_sea_level_rise_score(lat, lon)
+    result = await asyncio.to_thread(get_sea_level_rise_score, lat, lon)
     return {"zip": zip, "coordinates": coords, **result}
 
 
 @router.get("/transit-access")
-def transit_access(zip: str):
+async def transit_access(zip: str):
     """
     Evaluate public transit accessibility for a ZIP code.
 
@@ -347,16 +458,16 @@ def transit_access(zip: str):
     ZIP centroid via the Overpass API and converts the count into a
     0–100 score.  Five or more stops saturate the score at 100.
     """
-    coords = get_coordinates_from_zip(zip)
+    coords = await asyncio.to_thread(get_coordinates_from_zip, zip)
     if not coords:
         return {"error": "Invalid ZIP code"}
     lat, lon = coords
-    result = get_transit_access_score(lat, lon)
+    result = await asyncio.to_thread(get_transit_access_score, lat, lon)
     return {"zip": zip, "coordinates": coords, **result}
 
 
 @router.get("/water")
-def water(zip: str):
+async def water(zip: str):
     """
     Compute a local water availability score for a ZIP code.
 
@@ -365,16 +476,16 @@ def water(zip: str):
     into a 0–100 score.  More water features translate into a higher
     score.
     """
-    coords = get_coordinates_from_zip(zip)
+    coords = await asyncio.to_thread(get_coordinates_from_zip, zip)
     if not coords:
         return {"error": "Invalid ZIP code"}
     lat, lon = coords
-    result = get_water_score(lat, lon)
+    result = await asyncio.to_thread(get_water_score, lat, lon)
     return {"zip": zip, "coordinates": coords, **result}
 
 
 @router.get("/flood-risk")
-def flood_risk_endpoint(zip: str):
+async def flood_risk_endpoint(zip: str):
     """
     Estimate riverine flood risk for a ZIP code based on real‑time
     flooding data.
@@ -385,9 +496,9 @@ def flood_risk_endpoint(zip: str):
     distance (and thus lower immediate risk).  In the absence of any
     flooding points, the score defaults to 100.
     """
-    coords = get_coordinates_from_zip(zip)
+    coords = await asyncio.to_thread(get_coordinates_from_zip, zip)
     if not coords:
         return {"error": "Invalid ZIP code"}
     lat, lon = coords
-    result = get_rtfi_flood_risk(lat, lon)
+    result = await asyncio.to_thread(get_rtfi_flood_risk, lat, lon)
     return {"zip": zip, "coordinates": coords, **result}
\ No newline at end of file
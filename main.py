@@ -2,7 +2,7 @@
 FastAPI app with:
 - Router include
 - Startup prewarm for Houston ZIPs (gentle pacing to avoid Overpass 429s)
-- Redis expiration listener that auto-rewarms ZIPs when their 30-day cache expires
+- Refresh-ahead worker that re-warms cached ZIPs shortly before their 30-day cache expires
 """
 
 from __future__ import annotations
@@ -21,8 +21,8 @@ try:
 except ImportError:
     pass
 
-from api.endpoints import router, compute_green_score  # compute_green_score must be SYNC
-from utils.kv import r, cache_set_zip, ZIP_CACHE_PREFIX
+from api.endpoints import router, compute_green_score, SHARED_EXECUTOR  # compute_green_score is async
+from utils.kv import r, cache_get_zips, cache_set_zip, refresh_claim_due, refresh_schedule
 
 # Configure logging at the application level
 logging.basicConfig(
@@ -56,74 +56,97 @@ add_cors(app, origins=["https://ecoscore-kappa.vercel.app"])
 app.include_router(router)
 
 # Controls
-ENABLE_REDIS_EXPIRE_LISTENER = os.getenv("ENABLE_REDIS_EXPIRE_LISTENER", "1") == "1"
+ENABLE_CACHE_REFRESHER = os.getenv("ENABLE_CACHE_REFRESHER", "1") == "1"
+REFRESH_POLL_S = float(os.getenv("REFRESH_POLL_S", "5"))
+REFRESH_BATCH = int(os.getenv("REFRESH_BATCH", "8"))
+REFRESH_RETRY_S = float(os.getenv("REFRESH_RETRY_S", "900"))
 PREWARM_HOUSTON = os.getenv("PREWARM_HOUSTON", "1") == "1"
 PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "3"))
 PREWARM_SPACING_S = float(os.getenv("PREWARM_SPACING_S", "2.5"))  # lines up with OVERPASS_MIN_INTERVAL_S
 
-def _expiration_worker_blocking():
+async def _refresh_zip(z: str):
     """
-    Runs in a thread. Subscribes to Redis key expiration events and re-warms
-    any key that matches our greenscore prefix.
+    Recompute and re-cache one ZIP.  The metric fan-out and the Redis writes
+    both land on SHARED_EXECUTOR (the loop's default executor), so background
+    refreshes share the request path's bounded pool instead of spawning their own.
+    Returns the result of compute_green_score.
     """
+    data = await compute_green_score(z)
+    if isinstance(data, dict) and not data.get("error"):
+        await asyncio.to_thread(cache_set_zip, z, data)  # also reschedules z
+    return data
+
+async def _refresher():
+    """
+    Polls the refresh-ahead queue (filled by ``cache_set_zip``) and re-warms due
+    ZIPs, up to PREWARM_CONCURRENCY at a time.  Unlike keyspace notifications
+    this works on managed Redis, and entries are refreshed before they expire.
+    """
+    sem = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+    async def one(z):
+        async with sem:
+            data = await _refresh_zip(z)
+            if not isinstance(data, dict) or data.get("error"):
+                print(f"[refresh] ZIP {z} failed ({data}); retrying in {REFRESH_RETRY_S:g}s")
+                await asyncio.to_thread(refresh_schedule, z, time.time() + REFRESH_RETRY_S)
+
     while True:
         try:
-            # Try to enable keyevent notifications (may fail on managed redis—OK to ignore)
-            try:
-                r.config_set("notify-keyspace-events", "Ex")
-            except Exception:
-                pass
-
-            db = r.connection_pool.connection_kwargs.get("db", 0)
-            channel = f"__keyevent@{db}__:expired"
-            pubsub = r.pubsub(ignore_subscribe_messages=True)
-            pubsub.subscribe(channel)
-
-            for msg in pubsub.listen():
-                key = msg.get("data")
-                if isinstance(key, bytes):
-                    key = key.decode()
-                if not isinstance(key, str):
-                    continue
-                if not key.startswith(ZIP_CACHE_PREFIX):
-                    continue
-                zip_code = key[len(ZIP_CACHE_PREFIX):]
-                # Recompute synchronously in a thread
-                data = compute_green_score(zip_code)
-                if isinstance(data, dict) and not data.get("error"):
-                    cache_set_zip(zip_code, data)
-
+            due = await asyncio.to_thread(refresh_claim_due, REFRESH_BATCH)
+            if not due:
+                await asyncio.sleep(REFRESH_POLL_S)
+                continue
+            await asyncio.gather(*(one(z) for z in due))
         except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) as e:
             # Redis not ready; back off and retry
-            print(f"[redis-expire] Redis unavailable ({e}); retrying in 30s...")
-            time.sleep(30)
+            print(f"[refresh] Redis unavailable ({e}); retrying in 30s...")
+            await asyncio.sleep(30)
         except Exception as e:
-            print(f"[redis-expire] Listener error: {e}; retrying in 30s...")
-            time.sleep(30)
+            print(f"[refresh] Refresher error: {e}; retrying in 30s...")
+            await asyncio.sleep(30)
+
+# Leaky-bucket start gate: ZIP computations start at most one per
+# PREWARM_SPACING_S across all prewarm tasks, so Overpass load stays paced
+# no matter how many ZIPs are in flight.
+_prewarm_next_start = 0.0
+
+async def _prewarm_gate():
+    global _prewarm_next_start
+    now = asyncio.get_running_loop().time()
+    start = max(now, _prewarm_next_start)
+    _prewarm_next_start = start + PREWARM_SPACING_S
+    if start > now:
+        await asyncio.sleep(start - now)
 
 async def _prewarm_houston():
     zips = await asyncio.to_thread(fetch_houston_zips, False)
+    # One MGET to skip ZIPs that are already cached; the refresher keeps those warm.
+    cached = await asyncio.to_thread(cache_get_zips, zips)
+    zips = [z for z in zips if cached.get(z) is None]
     sem = asyncio.Semaphore(PREWARM_CONCURRENCY)
 
     async def one(z):
-        print(f"\n[ZIP {z}] Starting computation...")  # Added print
         async with sem:
-            data = await asyncio.to_thread(compute_green_score, z)
+            await _prewarm_gate()
+            print(f"\n[ZIP {z}] Starting computation...")  # Added print
+            data = await _refresh_zip(z)
             if isinstance(data, dict) and not data.get("error"):
                 print(f"[ZIP {z}] Success: {data}")  # Added print
-                await asyncio.to_thread(cache_set_zip, z, data)
             else:
                 print(f"[ZIP {z}] Error: {data}")  # Added print
-        await asyncio.sleep(PREWARM_SPACING_S)
 
     await asyncio.gather(*(asyncio.create_task(one(z)) for z in zips))
 
 @app.on_event("startup")
 async def startup():
+    loop = asyncio.get_running_loop()
+    # Route asyncio.to_thread work through the same pool as the score fan-out
+    loop.set_default_executor(SHARED_EXECUTOR)
     # if PREWARM_HOUSTON:
         # asyncio.create_task(_prewarm_houston())
-    if ENABLE_REDIS_EXPIRE_LISTENER:
-        asyncio.create_task(asyncio.to_thread(_expiration_worker_blocking))
+    if ENABLE_CACHE_REFRESHER:
+        asyncio.create_task(_refresher())
 
 # Middleware to capture and expose response timing.
 @app.middleware("http")
@@ -10,22 +10,21 @@ Usage:
 
 Notes
 - By default we exclude PO-box ZIPs (772xx). Use --include-po-boxes to include them.
-- Requests are sent in per-minute batches of size --rpm; each batch is executed
-  concurrently up to --concurrency workers, then the script sleeps until a minute
-  has passed before sending the next batch.
+- Requests are paced by a token bucket at --rpm requests per minute and run
+  concurrently up to --concurrency in-flight requests over one keep-alive
+  httpx client (HTTP/2 when the server offers it).
 - This warms the in-memory TTL caches on your API server since the server itself
   executes the underlying utils calls.
 """
 
 import argparse
-import concurrent.futures as cf
+import asyncio
 import csv
 import time
 import datetime as dt
 from typing import List, Set
+import httpx
 import requests
-import string 
-import os
 
 HOUSTON_ZIPS_URL = "https://api.zippopotam.us/us/tx/houston"
 
@@ -67,11 +66,31 @@ def fetch_houston_zips(include_po_boxes: bool) -> List[str]:
     # Fallback
     return sorted([z for z in FALLBACK_HOUSTON_ZIPS if include_po_boxes or not z.startswith("772")])
 
-def prewarm_one(base_url: str, zip_code: string) -> dict:
+class TokenBucket:
+    """Async token bucket: refills at `rate` tokens/s and holds at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def take(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+async def prewarm_one(client: httpx.AsyncClient, zip_code: str) -> dict:
     t0 = time.time()
-    url = f"{base_url.rstrip('/')}/green-score"
     try:
-        resp = requests.get(url, params={"zip": zip_code}, timeout=120)
+        resp = await client.get("/green-score", params={"zip": zip_code})
         elapsed = time.time() - t0
         ok = resp.status_code == 200
         payload = resp.json() if ok else {"error": resp.text}
@@ -92,38 +111,32 @@ def prewarm_one(base_url: str, zip_code: string) -> dict:
             "error": str(e)[:300]
         }
 
-def run_batches(base_url: str, zips: List[str], rpm: int, concurrency: int, dry_run: bool):
+async def run_batches_async(base_url: str, zips: List[str], rpm: int, concurrency: int, dry_run: bool):
     assert rpm >= 1, "rpm must be >= 1"
     assert concurrency >= 1, "concurrency must be >= 1"
     results = []
-    batch_size = rpm  # requests per minute
     started = dt.datetime.utcnow()
 
     print(f"Discovered {len(zips)} Houston ZIPs")
     print(f"Prewarming against {base_url} with rpm={rpm}, concurrency={concurrency}, dry_run={dry_run}")
-    for i in range(0, len(zips), batch_size):
-        batch = zips[i:i+batch_size]
-        print(f"\nBatch {i//batch_size + 1}: {batch}")
-        t_batch_start = time.time()
-        if dry_run:
-            for z in batch:
-                results.append({"zip": z, "status": -1, "ok": True, "elapsed_s": 0.0, "error": None})
-        else:
-            with cf.ThreadPoolExecutor(max_workers=concurrency) as ex:
-                futs = [ex.submit(prewarm_one, base_url, z) for z in batch]
-                for fut in cf.as_completed(futs):
-                    res = fut.result()
-                    results.append(res)
-                    status = "OK" if res["ok"] else f"ERR({res['status']})"
-                    print(f"  {res['zip']}: {status} in {res['elapsed_s']}s" + (f" – {res['error']}" if res['error'] else ""))
-
-        # Rate limit: ensure at least 60s between batches
-        elapsed = time.time() - t_batch_start
-        if i + batch_size < len(zips):  # if more to run
-            sleep_s = max(0.0, 60.0 - elapsed)
-            if sleep_s > 0:
-                print(f"Sleeping {sleep_s:.1f}s to respect rpm")
-                time.sleep(sleep_s)
+    if dry_run:
+        for z in zips:
+            results.append({"zip": z, "status": -1, "ok": True, "elapsed_s": 0.0, "error": None})
+    else:
+        sem = asyncio.Semaphore(concurrency)
+        bucket = TokenBucket(rpm / 60.0)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(base_url=base_url.rstrip("/"), http2=True, limits=limits, timeout=120) as client:
+            async def one(z):
+                async with sem:
+                    await bucket.take()
+                    res = await prewarm_one(client, z)
+                results.append(res)
+                status = "OK" if res["ok"] else f"ERR({res['status']})"
+                print(f"  {res['zip']}: {status} in {res['elapsed_s']}s" + (f" – {res['error']}" if res['error'] else ""))
+
+            await asyncio.gather(*(one(z) for z in zips))
 
     finished = dt.datetime.utcnow()
     # Write CSV log
@@ -141,7 +154,7 @@ def main():
     p = argparse.ArgumentParser()
     p.add_argument("--base-url", default="http://localhost:8000", help="Your API base URL")
     p.add_argument("--rpm", type=int, default=6, help="Requests per minute (total, across all workers)")
-    p.add_argument("--concurrency", type=int, default=2, help="Concurrent workers within each minute")
+    p.add_argument("--concurrency", type=int, default=2, help="Maximum in-flight requests")
     p.add_argument("--include-po-boxes", action="store_true", help="Include 772xx PO-box ZIPs")
     p.add_argument("--limit", type=int, default=0, help="Limit number of ZIPs (for testing)")
     p.add_argument("--dry-run", action="store_true", help="Discover and print, but do not call the API")
@@ -150,7 +163,7 @@ def main():
     zips = fetch_houston_zips(include_po_boxes=args.include_po_boxes)
     if args.limit and args.limit > 0:
         zips = zips[:args.limit]
-    run_batches(args.base_url, zips, rpm=args.rpm, concurrency=args.concurrency, dry_run=args.dry_run)
+    asyncio.run(run_batches_async(args.base_url, zips, rpm=args.rpm, concurrency=args.concurrency, dry_run=args.dry_run))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,40 @@
+"""
+Numba kernel for NDVI threshold counting.
+
+``ndvi_counts`` does the work of ``raster.ndvi_masks`` in a single
+multi-threaded pass over the rows of a (4, H, W) RGB+NIR window, with
+no temporary arrays.  It is None when numba is not installed, in which
+case ``ndvi_masks`` uses its NumPy path.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange  # type: ignore
+except ImportError:
+    ndvi_counts = None
+else:
+    # No fastmath: the float32 operations must stay in the same order as
+    # compute_ndvi() for the counts to match it exactly.
+    @njit(parallel=True, cache=True)
+    def ndvi_counts(arr, pav_thr, veg_thr):
+        """Return (pavement, canopy) pixel counts for NDVI < pav_thr and NDVI > veg_thr."""
+        red = arr[0]
+        nir = arr[3]
+        h, w = red.shape
+        eps = np.float32(1e-5)
+        pav_t = np.float32(pav_thr)
+        veg_t = np.float32(veg_thr)
+        pavement = 0
+        canopy = 0
+        for y in prange(h):
+            for x in range(w):
+                r = np.float32(red[y, x])
+                n = np.float32(nir[y, x])
+                num = n - r
+                den = (n + r) + eps
+                if num < pav_t * den:
+                    pavement += 1
+                if num > veg_t * den:
+                    canopy += 1
+        return pavement, canopy
@@ -10,24 +10,21 @@ calls for the same ZIP code.
 from __future__ import annotations
 
 import os
-import requests
 from typing import Dict, Any, Optional, List
-from .cache import ttl_cache
+
+import numpy as np
+import orjson
+
+from .cache import redis_ttl_cache
+from .http_session import SESSION
 from dotenv import load_dotenv
 
 load_dotenv()
 
-API_KEY = None  
-
-def _compute_score_from_aqi(aqi: float) -> int:
-    """
-    Convert AQI to a 0–100 green-score.
-    """
-    try:
-        x = float(aqi)
-    except (TypeError, ValueError):
-        return 0
+API_KEY = os.getenv("AIRNOW_API_KEY")  # read once, after load_dotenv()
 
+def _score_from_aqi_formula(x: float) -> int:
+    """Piecewise-linear AQI → 0–100 green-score mapping."""
     if x <= 0:
         return 100
     if x <= 50:
@@ -51,29 +48,48 @@ def _compute_score_from_aqi(aqi: float) -> int:
     return 0
 
 
-@ttl_cache(seconds=3600)
-def get_aqi_by_zip(zip_code: str, distance: int = 25) -> Dict[str, Any]:
+# AirNow reports integer AQIs, so the common case is a table lookup.
+_SCORE_LUT = np.array([_score_from_aqi_formula(i) for i in range(501)], dtype=np.int16)
+
+
+def _compute_score_from_aqi(aqi: float) -> int:
+    """
+    Convert AQI to a 0–100 green-score.
+    """
+    try:
+        x = float(aqi)
+    except (TypeError, ValueError):
+        return 0
+    if x.is_integer():
+        return int(_SCORE_LUT[min(500, max(0, int(x)))])
+    return _score_from_aqi_formula(x)
+
+
+@redis_ttl_cache("airnow", 3600)
+def get_aqi_by_zip(zip_code: str, distance: int = 25, *, detail: bool = False) -> Dict[str, Any]:
     """
     Retrieve current AQI observations for a ZIP code using the AirNow API.
+
+    The per-station ``observations`` list is only built (and returned)
+    when ``detail`` is true; otherwise just the score summary is returned.
     """
-    api_key = os.getenv("AIRNOW_API_KEY")
-    if not api_key:
+    if not API_KEY:
         return {"error": "AIRNOW_API_KEY environment variable is not set."}
     base_url = "https://www.airnowapi.org/aq/observation/zipCode/current/"
     params = {
         "format": "application/json",
         "zipCode": zip_code,
         "distance": distance,
-        "API_KEY": api_key,
+        "API_KEY": API_KEY,
     }
     try:
-        resp = requests.get(base_url, params=params, timeout=30)
+        resp = SESSION.get(base_url, params=params, timeout=30)
     except Exception as e:
         return {"error": f"Request failed: {e}"}
     if resp.status_code != 200:
         return {"error": f"AirNow API returned {resp.status_code}: {resp.text}"}
     try:
-        data = resp.json()
+        data = orjson.loads(resp.content)
     except Exception as e:
         return {"error": f"Failed to parse JSON: {e}"}
     if not isinstance(data, list) or not data:
@@ -82,11 +98,17 @@ def get_aqi_by_zip(zip_code: str, distance: int = 25) -> Dict[str, Any]:
     primary_pollutant: Optional[str] = None
     observations: List[Dict[str, Any]] = []
     for rec in data:
+        v = rec.get("AQI")
         try:
-            aqi_val = float(rec.get("AQI")) if rec.get("AQI") is not None else None
+            aqi_val = float(v) if v is not None else None
         except (TypeError, ValueError):
             aqi_val = None
         pollutant = rec.get("ParameterName") or rec.get("Parameter")
+        if aqi_val is not None and (max_aqi is None or aqi_val > max_aqi):
+            max_aqi = aqi_val
+            primary_pollutant = pollutant
+        if not detail:
+            continue
         category = None
         cat_obj = rec.get("Category")
         if isinstance(cat_obj, dict):
@@ -106,15 +128,14 @@ def get_aqi_by_zip(zip_code: str, distance: int = 25) -> Dict[str, Any]:
             "date_observed": rec.get("DateObserved"),
             "hour_observed": rec.get("HourObserved"),
         })
-        if aqi_val is not None and (max_aqi is None or aqi_val > max_aqi):
-            max_aqi = aqi_val
-            primary_pollutant = pollutant
     if max_aqi is None:
         return {"error": "No valid AQI values returned by AirNow API"}
     score = _compute_score_from_aqi(max_aqi)
-    return {
+    result: Dict[str, Any] = {
         "score": score,
         "max_aqi": max_aqi,
         "primary_pollutant": primary_pollutant,
-        "observations": observations,
-    }
\ No newline at end of file
+    }
+    if detail:
+        result["observations"] = observations
+    return result
\ No newline at end of file
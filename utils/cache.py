@@ -1,22 +1,48 @@
+import hashlib
+import heapq
+import inspect
+import threading
 import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Any, Callable, Dict, Tuple, FrozenSet
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 
-def ttl_cache(seconds: int = (30 * 24 * 3600)):
+import orjson
+import redis
+
+from . import kv
+
+_KWARGS_MARK = object()
+
+def is_cacheable(result: Any) -> bool:
+    """False for error results (a dict with a top-level ``error`` key), which should be retried rather than cached."""
+    return not (isinstance(result, dict) and "error" in result)
+
+def ttl_cache(seconds: int = (30 * 24 * 3600), maxsize: int = 1024,
+              should_cache: Optional[Callable[[Any], bool]] = None):
     """
     Simple decorator to add time‑to‑live (TTL) caching to a function.
 
     Each unique combination of positional and keyword arguments is cached
-    alongside the timestamp when it was stored.  When the decorated
-    function is called, the cache is checked and the stored value is
-    returned if it has not expired.  Otherwise, the function is
-    executed and its result cached.
+    alongside its expiry time.  When the decorated function is called,
+    the cache is checked and the stored value is returned if it has not
+    expired.  Otherwise, the function is executed and its result cached.
+
+    Entries are kept in LRU order and bounded by ``maxsize``; a min-heap
+    of expiry times lets each call drop the expired entries in O(k)
+    instead of letting them accumulate.
 
     Parameters
     ----------
     seconds : int, optional
-        Number of seconds to keep a cached result.  Defaults to 3600
-        (one hour).
+        Number of seconds to keep a cached result.  Defaults to 30 days.
+    maxsize : int, optional
+        Maximum number of cached results; the least recently used entry
+        is evicted beyond that.  Defaults to 1024.
+    should_cache : callable, optional
+        Predicate on the result; results it rejects are returned but not
+        stored (pass ``is_cacheable`` to skip error results, as
+        ``redis_ttl_cache`` does).  Defaults to caching everything.
 
     Returns
     -------
@@ -24,22 +50,106 @@ def ttl_cache(seconds: int = (30 * 24 * 3600)):
         A wrapper function with TTL caching applied.
     """
     def decorator(fn: Callable):
-        cache: Dict[Tuple[Tuple[Any, ...], FrozenSet[Tuple[str, Any]]], Tuple[Any, float]] = {}
+        cache: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        heap: List[Tuple[float, Hashable]] = []  # (expiry, key); may hold stale pairs
+        lock = threading.Lock()  # wrappers run concurrently on the score executor
+
+        def _sweep(now: float) -> None:
+            while heap and heap[0][0] <= now:
+                expiry, key = heapq.heappop(heap)
+                entry = cache.get(key)
+                if entry is not None and entry[1] == expiry:
+                    del cache[key]
+            if len(heap) > 2 * maxsize:
+                # Too many stale pairs left behind by LRU evictions and re-inserts.
+                heap[:] = [(exp, k) for k, (_, exp) in cache.items()]
+                heapq.heapify(heap)
+
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            # Create a hashable key from args and kwargs
-            key = (args, frozenset(kwargs.items()))
+            # Create a hashable key from args and kwargs: the positional tuple
+            # itself in the common no-kwargs case, else one flat tuple
+            # (the marker keeps f(a, k=1) and f(a, ("k", 1)) apart)
+            key = args + (_KWARGS_MARK, *sorted(kwargs.items())) if kwargs else args
             now = time.time()
 
             # Check existing cached value
-            if key in cache:
-                val, ts = cache[key]
-                if now - ts < seconds:
-                    return val
-                
+            with lock:
+                _sweep(now)
+                entry = cache.get(key)
+                if entry is not None:
+                    cache.move_to_end(key)
+                    return entry[0]
+
             # Compute and cache result
             result = fn(*args, **kwargs)
-            cache[key] = (result, now)
+            if should_cache is not None and not should_cache(result):
+                return result
+            expiry = now + seconds
+            with lock:
+                cache[key] = (result, expiry)
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+                heapq.heappush(heap, (expiry, key))
+            return result
+        return wrapper
+    return decorator
+
+
+def redis_ttl_cache(prefix: str, seconds: int, quantize: Optional[Dict[str, int]] = None):
+    """
+    Decorator that caches JSON-serializable results in Redis.
+
+    Unlike ``ttl_cache`` the cache is shared by every worker process and
+    survives restarts.  Results are stored with ``SETEX`` under
+    ``<prefix>:<blake2b(args)>``.  Results carrying a top-level ``error``
+    key are not cached, so a transient upstream failure is not pinned
+    for the whole TTL on every worker.  Redis failures are non-fatal:
+    the wrapped function is simply called.
+
+    Parameters
+    ----------
+    prefix : str
+        Key namespace, normally the upstream source (``"airnow"``).
+    seconds : int
+        Number of seconds to keep a cached result.
+    quantize : dict, optional
+        ``{argument name: decimals}`` to round in the cache key only, e.g.
+        ``{"lat": 4, "lon": 4}`` (~11 m) so nearly identical coordinates
+        share an entry.  The function itself still sees the exact values.
+    """
+    def decorator(fn: Callable):
+        sig = inspect.signature(fn) if quantize else None
+
+        def _key_args(args, kwargs):
+            if sig is None:
+                return args, kwargs
+            bound = sig.bind(*args, **kwargs)
+            for name, nd in quantize.items():
+                v = bound.arguments.get(name)
+                if isinstance(v, float):
+                    bound.arguments[name] = round(v, nd) + 0.0  # + 0.0 folds -0.0 into 0.0
+            return bound.args, bound.kwargs
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            kargs, kkwargs = _key_args(args, kwargs)
+            raw = repr((kargs, tuple(sorted(kkwargs.items())))).encode()
+            key = f"{prefix}:{hashlib.blake2b(raw, digest_size=16).hexdigest()}"
+            try:
+                hit = kv.r.get(key)
+            except redis.exceptions.RedisError:
+                hit = None
+            if hit is not None:
+                return orjson.loads(hit)
+
+            result = fn(*args, **kwargs)
+            if is_cacheable(result):
+                try:
+                    kv.r.setex(key, seconds, orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY))
+                except (redis.exceptions.RedisError, TypeError):
+                    pass
             return result
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -10,13 +10,14 @@ frequently.
 from __future__ import annotations
 
 import os
-import requests
 from typing import Dict, Any
-from .cache import ttl_cache
+import orjson
+from .cache import redis_ttl_cache
+from .http_session import SESSION
 
 CENSUS_API_KEY = os.getenv("CENSUS_API_KEY")
 
-@ttl_cache(seconds=86400 * 30)
+@redis_ttl_cache("census", 86400 * 30)
 def get_demographics(zip_code: str) -> Dict[str, Any]:
     """
     Fetch demographic indicators for a ZIP Code Tabulation Area.
@@ -40,13 +41,13 @@ def get_demographics(zip_code: str) -> Dict[str, Any]:
     if CENSUS_API_KEY:
         params["key"] = CENSUS_API_KEY
     try:
-        resp = requests.get(base_url, params=params, timeout=30)
+        resp = SESSION.get(base_url, params=params, timeout=30)
     except Exception as e:
         return {"error": f"Request failed: {e}"}
     if resp.status_code != 200:
         return {"error": f"Census API returned {resp.status_code}: {resp.text}"}
     try:
-        data = resp.json()
+        data = orjson.loads(resp.content)
     except Exception as e:
         return {"error": f"Failed to parse JSON: {e}"}
     if not data or len(data) < 2:
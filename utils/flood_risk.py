@@ -19,73 +19,95 @@ returns a score of 100 and indicates the error in the response.
 from __future__ import annotations
 
 import math
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 
-import requests
+import numpy as np
+import orjson
 
-# ---- TTL cache (fallback if shared cache not available) --------------------
+from .http_session import SESSION
+
+
+# ---- Redis TTL cache (fallback if shared cache not available) --------------
 try:
-    from .cache import ttl_cache  # type: ignore
+    from .cache import redis_ttl_cache  # type: ignore
 except Exception:
-    def ttl_cache(seconds: int = 3600):  # type: ignore
+    def redis_ttl_cache(prefix: str, seconds: int = 3600, quantize=None):  # type: ignore
         def deco(fn):  # type: ignore
             return fn
         return deco
 
+SRC = "USGS Real-Time Flood Impact API"
+# No flooding sites (or none with usable coordinates) near enough to matter.
+_NO_FLOOD: Dict[str, Any] = {"score": 100, "nearest_flood_distance_km": None, "source": SRC}
+
+
+def _err(msg: str) -> Dict[str, Any]:
+    # treat as no flooding; score high
+    return {**_NO_FLOOD, "error": msg}
+
+
+@lru_cache(maxsize=8)
+def _score_steps_km(midpoint_km: float, steepness: float) -> Tuple[float, ...]:
+    # Distances where round(100 * logistic) steps up from j to j + 1, i.e.
+    # where the logistic crosses (j + 0.5) / 100.
+    return tuple(midpoint_km + math.log(p / (1.0 - p)) / steepness for p in ((j + 0.5) / 100 for j in range(100)))
+
+
 def _score_from_distance_km(d_km: float, *, midpoint_km: float = 50.0, steepness: float = 0.08) -> int:
     if d_km <= 0:
         return 0
-    # logistic in [0,1], then scale to [0,100]
-    x = 1.0 / (1.0 + math.exp(-steepness * (d_km - midpoint_km)))
-    return int(round(100 * x))
+    # logistic in [0,1], then scale to [0,100]; the score is the number of
+    # precomputed steps already passed, so no exp per call.
+    return bisect_right(_score_steps_km(midpoint_km, steepness), d_km)
 
 
-def _haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+def _haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
     """
-    Compute great‑circle distance between two points on Earth.
+    Great‑circle distances from one point to arrays of points, in kilometres.
     """
     R = 6371.0  # Earth radius in kilometres
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+    phi1, phi2 = np.deg2rad(lat), np.deg2rad(lats)
+    dphi = phi2 - phi1
+    dlambda = np.deg2rad(lons - lon)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(a))
 
 
-@ttl_cache(seconds=1 * 3600)  # cache for 1 hour; flood conditions change quickly
-def get_flood_risk(lat: float, lon: float) -> Dict[str, Any]:
-    """
-    Estimate flood risk based on proximity to current flooding points.
-    """
-    url = "https://api.waterdata.usgs.gov/rtfi-api/referencepoints/flooding"
+def _coord(pt: Any, field: str) -> float:
     try:
-        resp = requests.get(url, timeout=20)
+        return float(pt.get(field))
+    except Exception:
+        return math.nan
+
+
+FLOOD_URL = "https://api.waterdata.usgs.gov/rtfi-api/referencepoints/flooding"
+FLOOD_INDEX_TTL_S = 3600  # the national list is fetched at most once an hour per process
+FLOOD_RETRY_S = 60  # after a failed refresh, callers back off this long before fetching again
+
+# (fetched_at, lats, lons, grid) where grid maps a 1°x1° (floor lat, floor lon)
+# cell to the indices of the flooding points inside it.
+_flood_index: Optional[Tuple[float, np.ndarray, np.ndarray, Dict[Tuple[int, int], np.ndarray]]] = None
+_flood_index_lock = threading.Lock()  # held by the one thread refreshing the index
+_flood_error: Optional[Tuple[float, str]] = None  # (failed_at, message) of the last failed refresh
+
+
+def _fetch_flood_index():
+    """Download and grid the current flooding points; returns (index, error message)."""
+    try:
+        resp = SESSION.get(FLOOD_URL, timeout=20)
     except Exception as exc:
-        # treat as no flooding; score high
-        return {
-            "score": 100,
-            "nearest_flood_distance_km": None,
-            "error": f"Failed to fetch flood data: {exc}",
-            "source": "USGS Real-Time Flood Impact API",
-        }
+        return None, f"Failed to fetch flood data: {exc}"
     if resp.status_code != 200:
-        return {
-            "score": 100,
-            "nearest_flood_distance_km": None,
-            "error": f"Flood API returned {resp.status_code}: {resp.text}",
-            "source": "USGS Real-Time Flood Impact API",
-        }
+        return None, f"Flood API returned {resp.status_code}: {resp.text}"
     try:
-        data = resp.json()
+        data = orjson.loads(resp.content)
     except Exception as exc:
-        return {
-            "score": 100,
-            "nearest_flood_distance_km": None,
-            "error": f"Failed to parse flood data: {exc}",
-            "source": "USGS Real-Time Flood Impact API",
-        }
-    
+        return None, f"Failed to parse flood data: {exc}"
+
     # Expect a list of reference points with latitude and longitude fields
     points: List[Dict[str, Any]] = []
     if isinstance(data, list):
@@ -93,35 +115,100 @@ def get_flood_risk(lat: float, lon: float) -> Dict[str, Any]:
     elif isinstance(data, dict) and "referencePoints" in data:
         points = data.get("referencePoints", [])  # alternative field name
 
-    # If no flooding points are present, return a high score
-    if not points:
-        return {
-            "score": 100,
-            "nearest_flood_distance_km": None,
-            "source": "USGS Real-Time Flood Impact API",
-        }
-    
-    # Compute the minimum distance to any flooding reference point
-    min_distance: Optional[float] = None
-    for pt in points:
-        try:
-            pt_lat = float(pt.get("latitude"))
-            pt_lon = float(pt.get("longitude"))
-        except Exception:
-            continue
-        d = _haversine_distance(lat, lon, pt_lat, pt_lon)
-        if (min_distance is None) or (d < min_distance):
-            min_distance = d
+    # Unparseable coordinates become NaN and are dropped.
+    lats = np.fromiter((_coord(pt, "latitude") for pt in points), dtype=np.float64, count=len(points))
+    lons = np.fromiter((_coord(pt, "longitude") for pt in points), dtype=np.float64, count=len(points))
+    ok = ~(np.isnan(lats) | np.isnan(lons))
+    lats, lons = lats[ok], lons[ok]
+
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    for i, cell in enumerate(zip(np.floor(lats).astype(int).tolist(), np.floor(lons).astype(int).tolist())):
+        cells.setdefault(cell, []).append(i)
+    grid = {cell: np.array(ix, dtype=np.intp) for cell, ix in cells.items()}
+    return (time.monotonic(), lats, lons, grid), None
+
+
+def _cached_flood_index(now: float):
+    """``(index, error)`` if the cached state can answer without a fetch, else None."""
+    idx, failed = _flood_index, _flood_error
+    if idx is not None and now - idx[0] <= FLOOD_INDEX_TTL_S:
+        return idx, None
+    if failed is not None and now - failed[0] < FLOOD_RETRY_S:
+        # backing off after a failure: a stale index beats no index
+        return (idx, None) if idx is not None else (None, failed[1])
+    return None
+
+
+def _get_flood_index():
+    """Return the cached index (refreshing it past FLOOD_INDEX_TTL_S) and an error message."""
+    global _flood_index, _flood_error
+    hit = _cached_flood_index(time.monotonic())
+    if hit:
+        return hit
+    # One thread refreshes; while there is a stale index to serve, the others
+    # use it instead of queueing behind the fetch.
+    if not _flood_index_lock.acquire(blocking=_flood_index is None):
+        return _flood_index, None
+    try:
+        hit = _cached_flood_index(time.monotonic())  # a concurrent refresh may have finished
+        if hit:
+            return hit
+        idx, err = _fetch_flood_index()
+        if err:
+            _flood_error = (time.monotonic(), err)
+            return (_flood_index, None) if _flood_index is not None else (None, err)
+        _flood_index, _flood_error = idx, None
+        return idx, None
+    finally:
+        _flood_index_lock.release()
+
+
+def _block_clearance_km(lat: float, lon: float, cy: int, cx: int) -> float:
+    """Lower bound on the distance from (lat, lon) to anything outside its 3x3 cell block."""
+    R = 6371.0
+    dlat = min(lat - (cy - 1), (cy + 2) - lat)
+    dlon = min(lon - (cx - 1), (cx + 2) - lon)
+    # meridional gap, and the distance to the nearest bounding meridian
+    return min(R * math.radians(dlat),
+               R * math.asin(min(1.0, math.cos(math.radians(lat)) * math.sin(math.radians(dlon)))))
+
+
+def _nearest_flood_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray,
+                      grid: Dict[Tuple[int, int], np.ndarray]) -> Optional[float]:
+    if not len(lats):
+        return None
+    cy, cx = math.floor(lat), math.floor(lon)
+    near = [grid[c] for c in ((cy + dy, cx + dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)) if c in grid]
+    if near:
+        ix = np.concatenate(near)
+        best = float(_haversine_km(lat, lon, lats[ix], lons[ix]).min())
+        if best <= _block_clearance_km(lat, lon, cy, cx):
+            return best
+    # Nothing close enough in the neighbourhood to be provably nearest: scan all.
+    return float(_haversine_km(lat, lon, lats, lons).min())
+
+
+@redis_ttl_cache("usgs-flood", 1 * 3600, quantize={"lat": 4, "lon": 4})  # cache for 1 hour; flood conditions change quickly
+def get_flood_risk(lat: float, lon: float) -> Dict[str, Any]:
+    """
+    Estimate flood risk based on proximity to current flooding points.
+
+    The national point list is fetched once per FLOOD_INDEX_TTL_S and
+    gridded by 1° cells, so a lookup usually only measures the points in
+    the surrounding 3x3 cells.
+    """
+    idx, err = _get_flood_index()
+    if err:
+        return _err(err)
+    _, lats, lons, grid = idx
+
+    min_distance = _nearest_flood_km(lat, lon, lats, lons, grid)
     if min_distance is None:
-        # no valid coordinates in data
-        return {
-            "score": 100,
-            "nearest_flood_distance_km": None,
-            "source": "USGS Real-Time Flood Impact API",
-        }
-    
+        # no flooding points (with valid coordinates) at all; score high
+        return {**_NO_FLOOD}
+
     return {
         "score": _score_from_distance_km(min_distance),
         "nearest_flood_distance_km": round(min_distance, 2),
-        "source": "USGS Real-Time Flood Impact API",
-    }
\ No newline at end of file
+        "source": SRC,
+    }
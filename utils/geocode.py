@@ -1,37 +1,59 @@
 """
 Geocode ZIP codes to latitude and longitude coordinates using OpenStreetMap Nominatim.
 
-Requests to the Nominatim API are cached for one day to avoid repeated
-lookups.  Nominatim usage policies discourage heavy usage, so please
-respect the rate limits and cache results appropriately.
+Lookups are memoized in an LRU for the life of the process (ZIP
+centroids do not move, and the ~42k US ZIPs fit comfortably in memory)
+backed by a Redis cache shared between workers; transient request
+failures are not cached so they are retried.
+Nominatim usage policies discourage heavy usage, so please respect the
+rate limits and cache results appropriately.
 """
 
 from __future__ import annotations
 
-import requests
+from functools import lru_cache
 from typing import Optional, Tuple
-from .cache import ttl_cache
 
-@ttl_cache(seconds=86400)
+import orjson
+
+from .cache import redis_ttl_cache
+from .http_session import SESSION
+
 def get_coordinates_from_zip(zip_code: str) -> Optional[Tuple[float, float]]:
     """
     Convert a five‑digit ZIP code into (latitude, longitude) coordinates.
     """
+    try:
+        return _cached_coordinates(zip_code)
+    except Exception:
+        # Network or response failure: lru_cache does not memoize exceptions,
+        # so the lookup is retried on the next call.
+        return None
+
+def lookup_coordinates_from_zip(zip_code: str) -> Optional[Tuple[float, float]]:
+    """
+    Like ``get_coordinates_from_zip``, but a failed lookup (timeout, 429,
+    5xx, unparseable response) raises instead of returning None, so callers
+    can tell an unknown ZIP from an unavailable geocoder.
+    """
+    return _cached_coordinates(zip_code)
+
+@lru_cache(maxsize=100_000)
+@redis_ttl_cache("geocode", 30 * 24 * 3600)  # shared by workers; the LRU above skips the round-trip
+def _cached_coordinates(zip_code: str) -> Optional[Tuple[float, float]]:
     url = "https://nominatim.openstreetmap.org/search"
     params = {
         "postalcode": zip_code,
         "country": "USA",
         "format": "json"
     }
-    headers = {"User-Agent": "green-score-app"}
-    try:
-        res = requests.get(url, params=params, headers=headers, timeout=30)
-    except Exception:
-        return None
-    try:
-        data = res.json()
-    except Exception:
-        return None
+    res = SESSION.get(url, params=params, timeout=30)  # session carries the User-Agent
+    # The session's retries end by returning the last 429/5xx rather than
+    # raising; raise here so it is not memoized as "no such ZIP".
+    res.raise_for_status()
+    data = orjson.loads(res.content)
+    if not isinstance(data, list):
+        raise ValueError(f"Unexpected Nominatim response: {data!r:.200}")
     if data:
         try:
             lat = float(data[0]["lat"])
@@ -39,4 +61,4 @@ def get_coordinates_from_zip(zip_code: str) -> Optional[Tuple[float, float]]:
             return lat, lon
         except (KeyError, ValueError, TypeError):
             return None
-    return None
\ No newline at end of file
+    return None
@@ -1,8 +1,11 @@
 from __future__ import annotations
-from math import radians, sin, cos, sqrt, atan2, pi, exp
-from typing import Dict, Any, Iterable, Tuple
+from bisect import bisect_right
+from functools import lru_cache
+from math import radians, sin, cos, sqrt, atan2, pi, log
+from typing import Dict, Any, List, Tuple
 import os
 
+import numpy as np
 import overpy
 
 # Throttle helper (normalize to (api, query) signature)
@@ -55,11 +58,11 @@ except Exception:
                 raise last_exc
             raise overpy.exception.OverpassTooManyRequests("Overpass failed after retries")
 
-# TTL cache (fallback if not present)
+# Redis TTL cache (fallback if not present)
 try:
-    from utils.cache import ttl_cache  # type: ignore
+    from utils.cache import redis_ttl_cache  # type: ignore
 except Exception:
-    def ttl_cache(seconds: int = 3600):
+    def redis_ttl_cache(prefix: str, seconds: int = 3600, quantize=None):
         def deco(fn):
             return fn
         return deco
@@ -81,24 +84,72 @@ GREEN_TAGS = [
 # Exclude private-access features by default (can be disabled via env var)
 EXCLUDE_PRIVATE = os.getenv("GREENSPACE_EXCLUDE_PRIVATE", "1") not in ("0", "false", "False")
 TAG_FILTER = "".join(GREEN_TAGS) + ('["access"!="private"]' if EXCLUDE_PRIVATE else "")
+OVERPASS_TIMEOUT_S = int(os.getenv("OVERPASS_TIMEOUT_S", "120"))
 
-def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Great-circle distance in meters."""
+# Scoring knob defaults (overridable per call via get_green_space kwargs)
+ALPHA_M = float(os.getenv("GREENSPACE_ALPHA_M", "600"))
+DENSITY_K = float(os.getenv("GREENSPACE_DENSITY_K", "0.8"))
+BLEND_DISTANCE = float(os.getenv("GREENSPACE_BLEND_DISTANCE", "0.7"))
+
+# Query with everything but the search circle filled in at import;
+# holes are r (radius_m), la (lat) and lo (lon).
+_Q_TEMPLATE = (
+    f"[out:json][timeout:{OVERPASS_TIMEOUT_S}];("
+    + "".join(f"{kind}{TAG_FILTER}(around:{{r}},{{la}},{{lo}});" for kind in ("node", "way", "relation"))
+    + ");out center tags;"
+)
+
+def _nearest_m_np(lat0: float, lon0: float, lats: np.ndarray, lons: np.ndarray) -> float:
+    """Great-circle distance in meters to the closest of (lats, lons)."""
+    R = 6371000.0
+    phi0, phi = np.radians(lat0), np.radians(lats)
+    dlat, dlon = phi - phi0, np.radians(lons - lon0)
+    a = np.sin(dlat / 2) ** 2 + np.cos(phi0) * np.cos(phi) * np.sin(dlon / 2) ** 2
+    # haversine is monotonic in a, so only the winner needs the arcsin
+    return float(2 * R * np.arcsin(np.sqrt(a.min())))
+
+
+def _nearest_m_loop(lat0, lon0, lats, lons):
+    """Same as _nearest_m_np as a scalar loop, for numba to compile."""
     R = 6371000.0
-    dlat, dlon = radians(lat2 - lat1), radians(lon2 - lon1)
-    a = sin(dlat/2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2) ** 2
-    return 2 * R * atan2(sqrt(a), sqrt(1 - a))
+    phi0 = radians(lat0)
+    cos0 = cos(phi0)
+    best = 2.0
+    for i in range(lats.shape[0]):
+        phi = radians(lats[i])
+        s1 = sin((phi - phi0) / 2)
+        s2 = sin(radians(lons[i] - lon0) / 2)
+        a = s1 * s1 + cos0 * cos(phi) * s2 * s2
+        if a < best:
+            best = a
+    return 2 * R * atan2(sqrt(best), sqrt(1 - best))
+
+
+# Numba is optional: with it the centroid scan compiles to a native loop
+# (cached on disk across processes); without it NumPy does the same pass.
+try:
+    from numba import njit  # type: ignore
+    _nearest_m = njit(cache=True, fastmath=True)(_nearest_m_loop)
+except ImportError:
+    _nearest_m = _nearest_m_np
+
+
+@lru_cache(maxsize=8)
+def _distance_steps_m(alpha_m: float) -> Tuple[float, ...]:
+    # Ascending distances where round(100 * exp(-d / alpha)) drops by one,
+    # i.e. where the curve crosses j + 0.5 for j = 99 .. 0.
+    return tuple(-alpha_m * log((j + 0.5) / 100.0) for j in range(99, -1, -1))
 
 
 def _smooth_distance_score(distance_m: float | None, alpha_m: float) -> int:
     """
     0..100 score, decays smoothly with distance (higher is better).
     alpha_m controls the decay length (≈ distance where score ~= 37).
+    Looked up against precomputed step distances rather than calling exp.
     """
     if distance_m is None:
         return 0
-    v = 100.0 * exp(-max(0.0, distance_m) / max(1.0, alpha_m))
-    return max(0, min(100, round(v)))
+    return 100 - bisect_right(_distance_steps_m(max(1.0, alpha_m)), max(0.0, distance_m))
 
 
 def _density_score(count: int, radius_m: int, k: float) -> int:
@@ -114,57 +165,81 @@ def _density_score(count: int, radius_m: int, k: float) -> int:
     return max(0, min(100, round(v)))
 
 
-def _iter_osm_centroids(result: overpy.OverpassResult) -> Iterable[Tuple[str, int, float, float]]:
+def _osm_centroids(result: overpy.OverpassResult) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Yield unique (kind, osm_id, lat, lon) for nodes/ways/relations.
-    De-duplicate by stable (kind, id) key.
+    Return (lats, lons) arrays of node positions and way/relation centers.
+    overpy keys each element type by id, so there are no duplicates to drop;
+    ways/relations without a center ('out center') are skipped.
     """
-    seen: set[Tuple[str, int]] = set()
+    nodes = getattr(result, "nodes", [])
+    ways = getattr(result, "ways", [])
+    relations = getattr(result, "relations", [])
+    lats = np.empty(len(nodes) + len(ways) + len(relations), np.float64)
+    lons = np.empty_like(lats)
+    i = 0
 
     # Nodes: use lat/lon
-    for n in getattr(result, "nodes", []):
+    for n in nodes:
         try:
-            k = ("n", int(n.id))
-            if k in seen:
-                continue
-            seen.add(k)
-            yield ("n", int(n.id), float(n.lat), float(n.lon))
+            lats[i], lons[i] = float(n.lat), float(n.lon)
         except Exception:
             continue
+        i += 1
 
-    # Ways: use center_* from 'out center'
-    for w in getattr(result, "ways", []):
-        try:
-            lat2 = getattr(w, "center_lat", None)
-            lon2 = getattr(w, "center_lon", None)
-            if lat2 is None or lon2 is None:
-                continue
-            k = ("w", int(w.id))
-            if k in seen:
-                continue
-            seen.add(k)
-            yield ("w", int(w.id), float(lat2), float(lon2))
-        except Exception:
+    # Ways and relations: use center_* from 'out center'
+    for e in (*ways, *relations):
+        lat2 = getattr(e, "center_lat", None)
+        lon2 = getattr(e, "center_lon", None)
+        if lat2 is None or lon2 is None:
             continue
-
-    # Relations: use center_* from 'out center'
-    for r in getattr(result, "relations", []):
         try:
-            lat2 = getattr(r, "center_lat", None)
-            lon2 = getattr(r, "center_lon", None)
-            if lat2 is None or lon2 is None:
-                continue
-            k = ("r", int(r.id))
-            if k in seen:
-                continue
-            seen.add(k)
-            yield ("r", int(r.id), float(lat2), float(lon2))
+            lats[i], lons[i] = float(lat2), float(lon2)
         except Exception:
             continue
+        i += 1
+
+    return lats[:i], lons[:i]
+
+
+def _validate(lat: float, lon: float, radius_m: int) -> None:
+    # Basic input validation
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError("lat/lon out of bounds")
+    if radius_m <= 0:
+        raise ValueError("radius_m must be positive")
+
+
+def _knobs(alpha_m: float | None, density_k: float | None, blend_distance: float | None) -> Tuple[float, float, float]:
+    # Resolve tuning knobs (can be set via env or kwargs)
+    alpha_m = float(alpha_m) if alpha_m is not None else ALPHA_M
+    density_k = float(density_k) if density_k is not None else DENSITY_K
+    w = blend_distance if blend_distance is not None else BLEND_DISTANCE
+    return alpha_m, density_k, max(0.0, min(1.0, w))
+
+
+def _result(nearest: float | None, count: int, radius_m: int, alpha_m: float, density_k: float, w: float) -> Dict[str, Any]:
+    # Component scores
+    distance_score = _smooth_distance_score(nearest, alpha_m=alpha_m)
+    density_score = _density_score(count, radius_m=radius_m, k=density_k)
+    score = round(w * distance_score + (1.0 - w) * density_score)
+
+    return {
+        "score": score,
+        # "components": {"distance": distance_score, "density": density_score},
+        "nearest_distance_m": round(nearest, 1) if nearest is not None else None,
+        "num_parks": count,
+        # "query_radius_m": radius_m,
+        # "tags": [t.replace('"', "") for t in GREEN_TAGS],
+        # "exclude_private": EXCLUDE_PRIVATE,
+    }
 
 
 # Core
-@ttl_cache(seconds=int(os.getenv("GREENSPACE_TTL_SECONDS", str(30 * 24 * 3600))))  # default 30 days
+@redis_ttl_cache(
+    "greenspace",
+    int(os.getenv("GREENSPACE_TTL_SECONDS", str(30 * 24 * 3600))),  # default 30 days
+    quantize={"lat": 4, "lon": 4},  # ~11 m
+)
 def get_green_space(
     lat: float,
     lon: float,
@@ -187,50 +262,59 @@ def get_green_space(
         "tags": list[str],
       }
     """
-    # Basic input validation
-    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
-        raise ValueError("lat/lon out of bounds")
-    if radius_m <= 0:
-        raise ValueError("radius_m must be positive")
+    _validate(lat, lon, radius_m)
+    knobs = _knobs(alpha_m, density_k, blend_distance)
 
-    # Resolve tuning knobs (can be set via env or kwargs)
-    alpha_m = float(alpha_m if alpha_m is not None else os.getenv("GREENSPACE_ALPHA_M", "600"))
-    density_k = float(density_k if density_k is not None else os.getenv("GREENSPACE_DENSITY_K", "0.8"))
-    w = blend_distance if blend_distance is not None else float(os.getenv("GREENSPACE_BLEND_DISTANCE", "0.7"))
-    w = max(0.0, min(1.0, w))
-
-    q = f"""
-    [out:json][timeout:{int(os.getenv("OVERPASS_TIMEOUT_S", "120"))}];
-    (
-      node{TAG_FILTER}(around:{radius_m},{lat},{lon});
-      way{TAG_FILTER}(around:{radius_m},{lat},{lon});
-      relation{TAG_FILTER}(around:{radius_m},{lat},{lon});
-    );
-    out center tags;
-    """
+    q = _Q_TEMPLATE.format_map({"r": radius_m, "la": lat, "lo": lon})
 
     result = paced_query(API, q)
 
-    nearest: float | None = None
-    count = 0
+    lats, lons = _osm_centroids(result)
+    count = len(lats)
+    nearest: float | None = float(_nearest_m(lat, lon, lats, lons)) if count else None
+    return _result(nearest, count, radius_m, *knobs)
 
-    for _kind, _oid, cx, cy in _iter_osm_centroids(result):
-        d = _haversine_m(lat, lon, cx, cy)
-        if nearest is None or d < nearest:
-            nearest = d
-        count += 1
 
-    # Component scores
-    distance_score = _smooth_distance_score(nearest, alpha_m=alpha_m)
-    density_score = _density_score(count, radius_m=radius_m, k=density_k)
-    score = round(w * distance_score + (1.0 - w) * density_score)
+def get_green_space_batch(
+    coords: List[Tuple[float, float]],
+    radius_m: int = 5000,
+    *,
+    alpha_m: float | None = None,
+    density_k: float | None = None,
+    blend_distance: float | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    ``get_green_space`` for many points with a single Overpass query.
 
-    return {
-        "score": score,
-        # "components": {"distance": distance_score, "density": density_score},
-        "nearest_distance_m": round(nearest, 1) if nearest is not None else None,
-        "num_parks": count,
-        # "query_radius_m": radius_m,
-        # "tags": [t.replace('"', "") for t in GREEN_TAGS],
-        # "exclude_private": EXCLUDE_PRIVATE,
-    }
+    One query unions the search circles of every point; each returned
+    centroid is then attributed to every input point within ``radius_m``
+    of it (circles overlap, so a park can count for several points).
+    Results are in input order.  Unlike the per-point query, a way or
+    relation only counts if its *center* lies inside the circle.
+    """
+    if not coords:
+        return []
+    for lat, lon in coords:
+        _validate(lat, lon, radius_m)
+    knobs = _knobs(alpha_m, density_k, blend_distance)
+
+    circles = "".join(
+        f"{kind}{TAG_FILTER}(around:{radius_m},{lat},{lon});"
+        for lat, lon in coords for kind in ("node", "way", "relation")
+    )
+    result = paced_query(API, f"[out:json][timeout:{OVERPASS_TIMEOUT_S}];({circles});out center tags;")
+    lats, lons = _osm_centroids(result)
+
+    q = np.asarray(coords, dtype=np.float64)
+    # (points x centroids) haversine matrix in meters
+    phi0, phi = np.radians(q[:, :1]), np.radians(lats)[None, :]
+    dlat, dlon = phi - phi0, np.radians(lons[None, :] - q[:, 1:])
+    a = np.sin(dlat / 2) ** 2 + np.cos(phi0) * np.cos(phi) * np.sin(dlon / 2) ** 2
+    d = 2 * 6371000.0 * np.arcsin(np.sqrt(a))
+
+    out = []
+    for row in d:
+        inside = row[row <= radius_m]
+        nearest = float(inside.min()) if inside.size else None
+        out.append(_result(nearest, int(inside.size), radius_m, *knobs))
+    return out
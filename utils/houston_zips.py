@@ -1,7 +1,10 @@
 # utils/houston_zips.py
-import requests
 from typing import List, Set
 
+import orjson
+
+from .http_session import SESSION
+
 HOUSTON_ZIPS_URL = "https://api.zippopotam.us/us/tx/houston"
 FALLBACK = [
     "77002","77003","77004","77005","77006","77007","77008","77009","77010",
@@ -15,21 +18,22 @@ FALLBACK = [
     "77082","77083","77084","77085","77086","77087","77088","77089","77090","77091",
     "77092","77093","77094","77095","77096","77098","77099"
 ]
+# Both fallback answers are fixed, so build them once.
+_FALLBACK_ALL = tuple(sorted(FALLBACK))
+_FALLBACK_NO_PO = tuple(z for z in _FALLBACK_ALL if not z.startswith("772"))
 
 def fetch_houston_zips(include_po_boxes: bool = False) -> List[str]:
     try:
-        r = requests.get(HOUSTON_ZIPS_URL, timeout=20)
+        r = SESSION.get(HOUSTON_ZIPS_URL, timeout=20)
         r.raise_for_status()
-        data = r.json()
+        data = orjson.loads(r.content)
         zips: Set[str] = set()
         for place in data.get("places", []):
             z = place.get("post code") or place.get("post_code") or place.get("post-code")
-            if z and len(z) == 5 and z.isdigit():
+            if z and len(z) == 5 and z.isdigit() and (include_po_boxes or not z.startswith("772")):
                 zips.add(z)
-        if not include_po_boxes:
-            zips = {z for z in zips if not z.startswith("772")}
         if zips:
             return sorted(zips)
     except Exception:
         pass
-    return sorted([z for z in FALLBACK if include_po_boxes or not z.startswith("772")])
+    return list(_FALLBACK_ALL if include_po_boxes else _FALLBACK_NO_PO)
@@ -0,0 +1,32 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "20"))  # distinct hosts kept alive
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "50"))          # sockets per host
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "green-score-app")      # Nominatim rejects anonymous clients
+
+# Shared keep-alive session for the plain-HTTP wrappers (AirNow, Census,
+# Nominatim, USGS, zippopotam).  Reusing it skips the TCP+TLS handshake on
+# every cache miss.  requests.Session is safe to share across the score
+# fan-out threads for simple GETs.
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = HTTP_USER_AGENT
+
+# Transient upstream failures are retried with backoff (Retry-After honoured).
+# raise_on_status=False hands the final response back so callers keep
+# reporting "<API> returned <status>" as before.
+_adapter = HTTPAdapter(
+    pool_connections=HTTP_POOL_CONNECTIONS,
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    ),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
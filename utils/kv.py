@@ -1,21 +1,120 @@
-import os, json, redis
-from typing import Optional, Dict, Any
+import os, time, socket, hashlib, orjson, redis
+from typing import Optional, Dict, Any, Tuple, List
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 ZIP_CACHE_TTL_SECONDS = int(os.getenv("ZIP_CACHE_TTL_SECONDS", str(30*24*3600)))  # 30 days
 ZIP_CACHE_PREFIX = os.getenv("ZIP_CACHE_PREFIX", "greenscore:")
+ZIP_ETAG_PREFIX = os.getenv("ZIP_ETAG_PREFIX", "greenscore-etag:")  # must not start with ZIP_CACHE_PREFIX
 
-r = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+ZIP_REFRESH_QUEUE = os.getenv("ZIP_REFRESH_QUEUE", "greenscore-refresh")  # ZSET: zip -> refresh-due epoch
+ZIP_REFRESH_AHEAD_SECONDS = int(os.getenv("ZIP_REFRESH_AHEAD_SECONDS", str(6*3600)))
+ZIP_LOCK_PREFIX = os.getenv("ZIP_LOCK_PREFIX", "lock:greenscore:")
+# The lease must outlive a cold compute: every metric may run for the full
+# GS_METRIC_TIMEOUT_S, plus a margin for geocoding and the cache write.
+ZIP_LOCK_TTL_SECONDS = int(os.getenv("ZIP_LOCK_TTL_SECONDS", str(int(float(os.getenv("GS_METRIC_TIMEOUT_S", "120"))) + 30)))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Binary client: cached bodies are already JSON bytes and go to the client as-is,
+# so decoding them to str only to re-encode in the response is wasted work.
+r = redis.Redis.from_url(REDIS_URL, decode_responses=False)
 
 def _key(zip_code: str) -> str:
     return f"{ZIP_CACHE_PREFIX}{zip_code}"
 
+def _etag_key(zip_code: str) -> str:
+    return f"{ZIP_ETAG_PREFIX}{zip_code}"
+
+def _etag(body: bytes) -> str:
+    # Non-cryptographic use: blake2b is cheaper than sha256 on short payloads
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def cache_get_zip_with_etag(zip_code: str) -> Optional[Tuple[bytes, str]]:
+    """Return the cached (json_body, etag) for a ZIP in one MGET, or None on a miss."""
+    body, etag = r.mget(_key(zip_code), _etag_key(zip_code))
+    if not body:
+        return None
+    return body, etag.decode() if etag else _etag(body)
+
 def cache_get_zip(zip_code: str) -> Optional[Dict[str, Any]]:
     v = r.get(_key(zip_code))
-    return json.loads(v) if v else None
+    return orjson.loads(v) if v else None
+
+def cache_get_zips(zip_codes: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Batch ``cache_get_zip``: one MGET for all ZIPs, None for misses."""
+    if not zip_codes:
+        return {}
+    vals = r.mget([_key(z) for z in zip_codes])
+    return {z: orjson.loads(v) if v else None for z, v in zip(zip_codes, vals)}
+
+def _stage_zip(pipe, zip_code: str, payload: Dict[str, Any], ttl: int) -> Tuple[bytes, str]:
+    body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    etag = _etag(body)
+    pipe.setex(_key(zip_code), ttl, body)
+    pipe.setex(_etag_key(zip_code), ttl, etag)
+    pipe.zadd(ZIP_REFRESH_QUEUE, {zip_code: time.time() + max(0, ttl - ZIP_REFRESH_AHEAD_SECONDS)})
+    return body, etag
+
+def cache_set_zip(zip_code: str, payload: Dict[str, Any], ttl: int = ZIP_CACHE_TTL_SECONDS) -> Tuple[bytes, str]:
+    """Serialize ``payload`` once, store it and its ETag as sibling keys and return (json_body, etag)."""
+    pipe = r.pipeline()
+    entry = _stage_zip(pipe, zip_code, payload, ttl)
+    pipe.execute()
+    return entry
 
-def cache_set_zip(zip_code: str, payload: Dict[str, Any], ttl: int = ZIP_CACHE_TTL_SECONDS):
-    r.setex(_key(zip_code), ttl, json.dumps(payload))
+def cache_set_zips(items: Dict[str, Dict[str, Any]], ttl: int = ZIP_CACHE_TTL_SECONDS) -> None:
+    """Batch ``cache_set_zip``: every body, ETag and refresh slot in one pipeline round-trip."""
+    if not items:
+        return
+    pipe = r.pipeline()
+    for z, payload in items.items():
+        _stage_zip(pipe, z, payload, ttl)
+    pipe.execute()
 
 def cache_ttl(zip_code: str) -> int:
     return r.ttl(_key(zip_code))
+
+def refresh_schedule(zip_code: str, due_at: float) -> None:
+    r.zadd(ZIP_REFRESH_QUEUE, {zip_code: due_at})
+
+def refresh_claim_due(limit: int) -> List[str]:
+    """
+    Pop up to ``limit`` ZIPs whose refresh is due.  Each ZIP is claimed by the
+    worker whose ZREM removes it, so concurrent workers never share one.
+    """
+    due = r.zrangebyscore(ZIP_REFRESH_QUEUE, 0, time.time(), start=0, num=limit)
+    if not due:
+        return []
+    pipe = r.pipeline()
+    for z in due:
+        pipe.zrem(ZIP_REFRESH_QUEUE, z)
+    return [z.decode() for z, won in zip(due, pipe.execute()) if won]
+
+def acquire_zip_lock(zip_code: str, ttl: int = ZIP_LOCK_TTL_SECONDS) -> bool:
+    """Take the cross-worker lease for computing a ZIP.  Fails open if Redis is unavailable."""
+    try:
+        return bool(r.set(f"{ZIP_LOCK_PREFIX}{zip_code}", WORKER_ID, nx=True, ex=ttl))
+    except redis.exceptions.RedisError:
+        return True
+
+def zip_lock_held(zip_code: str) -> bool:
+    """Whether some worker currently holds the lease for a ZIP (False if Redis is unavailable)."""
+    try:
+        return bool(r.exists(f"{ZIP_LOCK_PREFIX}{zip_code}"))
+    except redis.exceptions.RedisError:
+        return False
+
+# Compare-and-delete in one step, so a lease that expired and was taken by
+# another worker between the GET and the DEL is never dropped.
+_release_lock = r.register_script("""
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+""")
+
+def release_zip_lock(zip_code: str) -> None:
+    """Drop the lease if this worker still holds it."""
+    try:
+        _release_lock(keys=[f"{ZIP_LOCK_PREFIX}{zip_code}"], args=[WORKER_ID])
+    except redis.exceptions.RedisError:
+        pass
@@ -11,10 +11,10 @@ for the same location.
 from __future__ import annotations
 
 from typing import Dict, Any
-from .raster import read_rgbn_window, compute_ndvi
-from .cache import ttl_cache
+from .raster import read_rgbn_window, ndvi_masks
+from .cache import redis_ttl_cache
 
-@ttl_cache(seconds=3600 * 24)
+@redis_ttl_cache("landcover", 3600 * 24)
 def get_canopy_and_pavement(lat: float, lon: float, radius_deg: float = 0.01, max_size: int = 512) -> Dict[str, Any]:
     """
     Compute both canopy and pavement coverage percentages for a geographic point.
@@ -46,9 +46,9 @@ def get_canopy_and_pavement(lat: float, lon: float, radius_deg: float = 0.01, ma
     if err:
         return {"error": err["error"]}
 
-    ndvi = compute_ndvi(arr)
-    canopy_pct = float((ndvi > 0.4).mean() * 100.0)
-    pavement_pct = float((ndvi < 0.1).mean() * 100.0)
+    pavement_px, canopy_px, total = ndvi_masks(arr, pav_thr=0.1, veg_thr=0.4)
+    canopy_pct = canopy_px / total * 100.0
+    pavement_pct = pavement_px / total * 100.0
 
     return {
         "canopy": round(canopy_pct, 2),
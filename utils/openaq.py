@@ -1,9 +1,13 @@
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
 # from dotenv import load_dotenv
 from math import radians, sin, cos, sqrt, atan2
 import math
 
+import numpy as np
+
+from .http_session import SESSION
+
 # load_dotenv()
 
 API_KEY = os.getenv("OPENAQ_API_KEY")
@@ -12,6 +16,9 @@ if not API_KEY:
 
 HEADERS = {"x-api-key": API_KEY}
 
+# Per-sensor lookups overlap on this pool instead of running one after another.
+_SENSOR_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("OPENAQ_SENSOR_WORKERS", "8")), thread_name_prefix="openaq")
+
 
 def haversine_km(lat1, lon1, lat2, lon2):
     """
@@ -25,13 +32,70 @@ def haversine_km(lat1, lon1, lat2, lon2):
     return R * c
 
 
+def haversine_km_vec(lat0, lon0, lats, lons):
+    """
+    Great-circle distances in kilometers from one point to arrays of points.
+    """
+    R = 6371  # Earth radius in kilometers
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.asarray(lons, dtype=np.float64)
+    phi0 = np.radians(lat0)
+    dlat = lats - phi0
+    dlon = np.radians(lons - lon0)
+    a = np.sin(dlat / 2) ** 2 + np.cos(phi0) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * R * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _fetch_sensor(info):
+    """
+    Latest measurement for one sensor, or None if unavailable or an outlier.
+    """
+    try:
+        resp = SESSION.get(
+            f"https://api.openaq.org/v3/sensors/{info['sensor_id']}",
+            headers=HEADERS,
+            timeout=30
+        )
+    except Exception:
+        return None
+    if resp.status_code == 404 or resp.status_code != 200:
+        return None
+
+    result = resp.json().get("results", [])
+    if not result:
+        return None
+
+    sensor_detail = result[0]
+    latest = sensor_detail.get("latest")
+    if latest and latest.get("value") is not None:
+        val = latest["value"]
+        if val < 0 or val > 500:
+            # Filter out absurd outliers
+            return None
+
+        return {
+            "station": info["location_name"],
+            "station_id": info["location_id"],
+            "sensor_id": info["sensor_id"],
+            "value": latest["value"],
+            "unit": sensor_detail["parameter"]["units"],
+            "timestamp": latest["datetime"]["utc"],
+            "distance_km": round(info["distance_km"], 2),
+            "station_coordinates": {
+                "latitude": info["loc_lat"],
+                "longitude": info["loc_lon"]
+            }
+        }
+    return None
+
+
 def get_measurements_by_coords(lat, lon, radius=10000, parameter="pm25"):
     """
     Compute the weihgted average and details of all contributing stations.
     """
 
     # Step 1: find nearby monitoring sites
-    loc_resp = requests.get(
+    loc_resp = SESSION.get(
         "https://api.openaq.org/v3/locations",
         params={
             "coordinates": f"{lat},{lon}",
@@ -39,7 +103,8 @@ def get_measurements_by_coords(lat, lon, radius=10000, parameter="pm25"):
             "limit": 20,
             "sort": "distance"
         },
-        headers=HEADERS
+        headers=HEADERS,
+        timeout=30
     )
     if loc_resp.status_code != 200:
         return {"error": f"Location lookup failed: {loc_resp.text}"}
@@ -49,14 +114,16 @@ def get_measurements_by_coords(lat, lon, radius=10000, parameter="pm25"):
         return {"error": "No nearby locations found"}
 
     # Step 2: collect all PM2.5 sensor IDs at each site
+    located = [loc for loc in locations if loc.get("coordinates")]
+    distances = haversine_km_vec(
+        lat, lon,
+        [loc["coordinates"]["latitude"] for loc in located],
+        [loc["coordinates"]["longitude"] for loc in located],
+    ).tolist()
     sensors_info = []
-    for loc in locations:
-        loc_coords = loc.get("coordinates")
-        if not loc_coords:
-            continue
-        loc_lat = loc_coords["latitude"]
-        loc_lon = loc_coords["longitude"]
-        distance_km = haversine_km(lat, lon, loc_lat, loc_lon)
+    for loc, distance_km in zip(located, distances):
+        loc_lat = loc["coordinates"]["latitude"]
+        loc_lon = loc["coordinates"]["longitude"]
 
         for s in loc.get("sensors", []):
             if s["parameter"]["name"] == parameter:
@@ -72,41 +139,8 @@ def get_measurements_by_coords(lat, lon, radius=10000, parameter="pm25"):
     if not sensors_info:
         return {"error": "No PM2.5 sensors found within radius"}
 
-    # Step 3: fetch latest measurement for each sensor
-    measurements = []
-    for info in sensors_info:
-        resp = requests.get(
-            f"https://api.openaq.org/v3/sensors/{info['sensor_id']}",
-            headers=HEADERS
-        )
-        if resp.status_code == 404 or resp.status_code != 200:
-            continue
-
-        result = resp.json().get("results", [])
-        if not result:
-            continue
-
-        sensor_detail = result[0]
-        latest = sensor_detail.get("latest")
-        if latest and latest.get("value") is not None:
-            val = latest["value"]
-            if val < 0 or val > 500:
-                # Filter out absurd outliers
-                continue
-
-            measurements.append({
-                "station": info["location_name"],
-                "station_id": info["location_id"],
-                "sensor_id": info["sensor_id"],
-                "value": latest["value"],
-                "unit": sensor_detail["parameter"]["units"],
-                "timestamp": latest["datetime"]["utc"],
-                "distance_km": round(info["distance_km"], 2),
-                "station_coordinates": {
-                    "latitude": info["loc_lat"],
-                    "longitude": info["loc_lon"]
-                }
-            })
+    # Step 3: fetch latest measurement for each sensor (concurrently; map keeps order)
+    measurements = [m for m in _SENSOR_POOL.map(_fetch_sensor, sensors_info) if m is not None]
 
     if not measurements:
         return {"error": "No valid PM2.5 measurements found from any nearby sensor"}
@@ -129,6 +163,16 @@ def get_measurements_by_coords(lat, lon, radius=10000, parameter="pm25"):
         "num_stations": len(measurements)
     }
 
+def _pm25_formula(pm25, scale=25):
+    capped = min(max(pm25, 0), scale)
+    ratio = capped / scale
+    nonlinear = math.sqrt(ratio)  # 0 to 1, but faster rise
+    return round(100 - nonlinear * 100)
+
+# Scores for 0.0, 0.1, ..., 25.0 µg/m³ at the default scale; readings are
+# usually reported to one decimal, so most calls are a table lookup.
+_PM25_LUT = np.array([_pm25_formula(i / 10) for i in range(251)], dtype=np.int16)
+
 def normalize_pm25(pm25, scale=25):
     """
     Nonlinear scaling using square root:
@@ -136,7 +180,9 @@ def normalize_pm25(pm25, scale=25):
     - 'scale' µg/m³ -> 0
     - curve in between
     """
-    capped = min(max(pm25, 0), scale)
-    ratio = capped / scale
-    nonlinear = math.sqrt(ratio)  # 0 to 1, but faster rise
-    return round(100 - nonlinear * 100)
+    if scale == 25:
+        capped = min(max(pm25, 0.0), 25.0)
+        i = round(capped * 10)
+        if i / 10 == capped:
+            return int(_PM25_LUT[i])
+    return _pm25_formula(pm25, scale)
@@ -0,0 +1,220 @@
+"""
+Batched Overpass count queries.
+
+Several metrics only need to know how many OSM features of some kind
+lie around a point (transit stops, water bodies).  Each module exposes
+a query fragment of the form ``(...);out count;``; this module posts
+any number of them as one Overpass request and returns the per-fragment
+tallies in order, so the metrics share a single round-trip (and a
+single slot in the mirror's per-IP queue) instead of one each.
+
+``batch_scores`` is the coordinator used by the green-score endpoint;
+``overpass_counts`` is the transport shared by the single-metric
+functions.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .http_session import SESSION
+from .overpass_throttle import acquire_token
+
+# HTTP/2 client for batch queries: several count queries to one mirror
+# share a single multiplexed connection instead of one TLS connection each.
+try:
+    import httpx  # type: ignore
+    _HTTPX = httpx.Client(http2=True, timeout=60, headers={"User-Agent": SESSION.headers["User-Agent"]})
+except Exception:
+    _HTTPX = None
+
+# ---- TTL cache (fallback if shared cache not available) --------------------
+try:
+    from .cache import is_cacheable, ttl_cache  # type: ignore
+except Exception:
+    def is_cacheable(result) -> bool:  # type: ignore
+        return True
+
+    def ttl_cache(seconds: int = 3600, maxsize: int = 1024, should_cache=None):  # type: ignore
+        def deco(fn):  # type: ignore
+            return fn
+        return deco
+
+try:
+    from .cache import redis_ttl_cache  # type: ignore
+except Exception:
+    def redis_ttl_cache(prefix: str, seconds: int = 3600, quantize=None):  # type: ignore
+        def deco(fn):  # type: ignore
+            return fn
+        return deco
+
+
+# Overpass API endpoints: the first OVERPASS_RACE_MIRRORS are raced, the
+# rest are tried in turn only if all of those fail.
+OVERPASS_URLS = (
+    "https://overpass.kumi.systems/api/interpreter",
+    "https://z.overpass-api.de/api/interpreter",
+    "https://overpass-api.de/api/interpreter",
+)
+OVERPASS_RACE_MIRRORS = int(os.getenv("OVERPASS_RACE_MIRRORS", "2"))
+_RACE = ThreadPoolExecutor(max_workers=4 * max(1, OVERPASS_RACE_MIRRORS), thread_name_prefix="osm-counts")
+
+# Circuit breaker: a mirror failing OVERPASS_BREAKER_FAILS times in a row is
+# skipped for OVERPASS_BREAKER_COOLDOWN_S instead of costing a timeout on
+# every call.
+OVERPASS_BREAKER_FAILS = int(os.getenv("OVERPASS_BREAKER_FAILS", "3"))
+OVERPASS_BREAKER_COOLDOWN_S = float(os.getenv("OVERPASS_BREAKER_COOLDOWN_S", "60"))
+_breaker: Dict[str, List[float]] = {url: [0, 0.0] for url in OVERPASS_URLS}  # url -> [consecutive fails, open until]
+_breaker_lock = threading.Lock()
+
+
+def _record(url: str, ok: bool) -> None:
+    with _breaker_lock:
+        state = _breaker.setdefault(url, [0, 0.0])
+        if ok:
+            state[0], state[1] = 0, 0.0
+        else:
+            state[0] += 1
+            if state[0] >= OVERPASS_BREAKER_FAILS:
+                state[1] = time.monotonic() + OVERPASS_BREAKER_COOLDOWN_S
+
+
+def _mirrors() -> List[str]:
+    """Mirrors in preference order, those with an open breaker last."""
+    now = time.monotonic()
+    with _breaker_lock:
+        # stable sort: otherwise keeps the configured order
+        return sorted(OVERPASS_URLS, key=lambda url: _breaker.get(url, (0, 0.0))[1] > now)
+
+
+def _post(url: str, query: str, timeout: int, http2: bool = False):
+    """POST the query to one mirror; the response if it answered 200, else None."""
+    client = _HTTPX if http2 and _HTTPX is not None else SESSION
+    acquire_token()  # shares the process-wide Overpass request budget
+    try:
+        response = client.post(url, data={"data": query}, timeout=timeout)
+    except Exception:
+        _record(url, False)
+        return None
+    if response.status_code != 200:
+        response.close()
+        _record(url, False)
+        return None
+    _record(url, True)
+    return response
+
+
+def _close_late(fut) -> None:
+    # A losing mirror's response is released back to the pool once it lands.
+    if not fut.cancelled() and fut.result() is not None:
+        fut.result().close()
+
+
+def _race(query: str, timeout: int, http2: bool = False):
+    """First 200 response among the raced mirrors, then the other healthy ones in turn; None if all fail."""
+    mirrors = _mirrors()
+    raced = mirrors[:max(1, OVERPASS_RACE_MIRRORS)]
+    futs = [_RACE.submit(_post, url, query, timeout, http2) for url in raced]
+    won = None
+    for fut in as_completed(futs):
+        if fut.result() is not None:
+            won = fut
+            break
+    for fut in futs:
+        if fut is not won:
+            fut.cancel()
+            fut.add_done_callback(_close_late)  # runs at once if already done
+    if won is not None:
+        return won.result()
+    now = time.monotonic()
+    for url in mirrors[len(raced):]:
+        if _breaker.get(url, (0, 0.0))[1] > now:
+            continue  # tripped: only used when too few healthy mirrors are left to race
+        response = _post(url, query, timeout, http2)
+        if response is not None:
+            return response
+    return None
+
+
+_COUNT_KEYS = ("nodes", "ways", "relations")
+_CSV_FIELDS = ", ".join(f'::"count:{k}"' for k in _COUNT_KEYS)
+
+
+def overpass_counts(fragments: Sequence[str], timeout: int = 60, *, http2: bool = False) -> Tuple[Optional[List[Dict[str, str]]], Optional[str]]:
+    """
+    Run ``(...);out count;`` fragments as one Overpass query.
+
+    ``http2`` sends it over the shared HTTP/2 client (when httpx is
+    available) so concurrent batch queries multiplex on one connection.
+
+    Output is requested as headerless CSV, one ``nodes,ways,relations``
+    row per ``out count``, so there is no JSON to parse at all.
+
+    Returns ``(tags, None)`` where ``tags[i]`` holds the tallies produced
+    by ``fragments[i]`` (``{"nodes": "3", "ways": "1", "relations":
+    "0"}``), or ``(None, error message)``.
+    """
+    query = f"[out:csv({_CSV_FIELDS}; false; \",\")][timeout:{timeout}];" + "".join(fragments)
+    response = _race(query, timeout, http2)
+    if response is None:
+        return None, "Overpass query failed or no suitable endpoint responded"
+    try:
+        # Rows come back in statement order, one per ``out count``.
+        tags = [dict(zip(_COUNT_KEYS, line.split(","))) for line in response.text.splitlines() if line]
+    except Exception as exc:
+        return None, f"Failed to parse Overpass response: {exc}"
+    if len(tags) != len(fragments):
+        return None, f"Failed to parse Overpass response: expected {len(fragments)} counts, got {len(tags)}"
+    return tags, None
+
+
+@ttl_cache(seconds=7 * 24 * 3600, should_cache=is_cacheable)  # one week, like the single-metric functions; errors are retried
+@redis_ttl_cache("osm-counts", 7 * 24 * 3600, quantize={"lat": 3, "lon": 3})  # L2: survives restarts, ~100 m cells
+def batch_scores(lat: float, lon: float, transit_radius_m: int = 1500, water_radius_m: int = 1000) -> Dict[str, Any]:
+    """
+    Compute the transit access and water availability scores with one Overpass request.
+
+    Returns ``{"transit": {...}, "water": {...}}`` shaped like
+    ``get_transit_access_score`` and ``get_water_score``, or
+    ``{"error": ...}`` if the request fails.
+
+    Water goes through the same path as ``get_water_score``: a known-empty
+    circle or the local extract answers it without Overpass, and a water
+    query already in flight for the point is joined rather than repeated;
+    only otherwise is it folded into the combined request.
+    """
+    from .transit import _transit_query_fragment, _transit_result
+    from .water import _finish_water_query, _join_water_query, _water_answer, _water_query_fragment, _water_shortcut
+
+    water = _water_shortcut(lat, lon, water_radius_m)
+    leader = False
+    if water is None:
+        key, fut, leader = _join_water_query(lat, lon, water_radius_m)
+        if not leader:
+            water = fut.result()
+            if "error" in water:
+                water = None  # the other caller's query failed: ask again with transit
+
+    fragments = [_transit_query_fragment(lat, lon, transit_radius_m)]
+    if water is None:
+        fragments.append(_water_query_fragment(lat, lon, water_radius_m))
+    try:
+        tags, err = overpass_counts(fragments)
+    except BaseException as exc:
+        if leader:
+            _finish_water_query(key, fut, exc=exc)
+        raise
+    if water is None:
+        water = {"error": err} if err else _water_answer(lat, lon, water_radius_m, tags[1])
+        if leader:
+            _finish_water_query(key, fut, water)
+    if err:
+        return {"error": err}
+    return {
+        "transit": _transit_result(tags[0], transit_radius_m),
+        "water": water,
+    }
@@ -1,4 +1,5 @@
 import os, time, threading, concurrent.futures as cf
+from functools import partial
 import overpy
 
 # Mirrors (first env var wins; otherwise hedge across these)
@@ -13,18 +14,77 @@ _MAX_RETRIES = int(os.getenv("OVERPASS_MAX_RETRIES", "4"))
 _BACKOFF_START = float(os.getenv("OVERPASS_BACKOFF_START_S", "1.5"))
 _HEDGE_MIRRORS = int(os.getenv("OVERPASS_HEDGE_MIRRORS", "2"))  # race the first 2 mirrors
 
+_CONCURRENCY = int(os.getenv("OVERPASS_CONCURRENCY", "4"))  # queries in flight per process
+_QUERY_TIMEOUT_S = float(os.getenv("OVERPASS_QUERY_TIMEOUT_S", "60"))  # per attempt, from when it is sent
+
+# Up to _CONCURRENCY queries run at once; starts against the same mirror are
+# spaced at least _MIN_INTERVAL_S apart (a leaky bucket per mirror), so each
+# mirror stays paced without serializing each query behind the previous
+# one's response, and hedged requests to different mirrors go out together.
+_slots = threading.BoundedSemaphore(_CONCURRENCY)
 _lock = threading.Lock()
-_last_call = 0.0
-
-def _paced_call(fn):
-    global _last_call
-    with _lock:
-        wait = _MIN_INTERVAL_S - (time.monotonic() - _last_call)
-        if wait > 0:
-            time.sleep(wait)
-        res = fn()
-        _last_call = time.monotonic()
-        return res
+_next_start = {}  # mirror url -> earliest monotonic time the next request may start
+
+# Process-wide token bucket over every Overpass request (all mirrors, overpy
+# and raw HTTP alike): OVERPASS_QPS sustained, bursts of OVERPASS_BURST.
+# Waiting here is cheaper than a 429 and the retry it costs.
+_QPS = float(os.getenv("OVERPASS_QPS", "2"))
+_BURST = float(os.getenv("OVERPASS_BURST", "4"))
+_bucket_lock = threading.Lock()
+_tokens = _BURST
+_tokens_at = time.monotonic()
+
+def acquire_token():
+    """Take one request token, sleeping until it is available."""
+    global _tokens, _tokens_at
+    with _bucket_lock:
+        now = time.monotonic()
+        _tokens = min(_BURST, _tokens + (now - _tokens_at) * _QPS)
+        _tokens_at = now
+        _tokens -= 1.0  # may go negative: a reservation later callers queue behind
+        wait = -_tokens / _QPS if _tokens < 0 else 0.0
+    if wait > 0:
+        time.sleep(wait)
+
+def _paced_call(url: str, fn, skip: threading.Event = None, sent: threading.Event = None):
+    """
+    Run ``fn`` in a slot paced for mirror ``url``; returns None without calling it if ``skip`` got set meanwhile.
+    ``sent`` is set just before the request goes out.
+    """
+    with _slots:
+        if skip is not None and skip.is_set():
+            return None  # decided while queued for the slot: reserve nothing
+        with _lock:
+            now = time.monotonic()
+            prev = _next_start.get(url, 0.0)
+            start = max(now, prev)
+            _next_start[url] = start + _MIN_INTERVAL_S
+        if start > now:
+            time.sleep(start - now)
+        if skip is not None and skip.is_set():
+            with _lock:
+                # Nothing was sent: hand the interval back unless a later
+                # call has already queued behind it.
+                if _next_start.get(url) == start + _MIN_INTERVAL_S:
+                    _next_start[url] = prev
+            return None
+        acquire_token()
+        if skip is not None and skip.is_set():
+            return None
+        if sent is not None:
+            sent.set()
+        return fn()
+
+# Clients and hedge threads are reused across queries.  overpy talks to the
+# mirrors through urllib, so there is no requests session to share here.
+_EXEC = cf.ThreadPoolExecutor(max_workers=max(2, _HEDGE_MIRRORS) * _CONCURRENCY, thread_name_prefix="overpass")
+_apis = {}
+
+def _api(url: str) -> overpy.Overpass:
+    api = _apis.get(url)
+    if api is None:
+        api = _apis.setdefault(url, overpy.Overpass(url=url))
+    return api
 
 def hedged_paced_query(q: str) -> overpy.Result:
     mirrors = [os.getenv("OVERPASS_URL")] if os.getenv("OVERPASS_URL") else DEFAULT_MIRRORS
@@ -32,16 +92,28 @@ def hedged_paced_query(q: str) -> overpy.Result:
     backoff = _BACKOFF_START
 
     for attempt in range(1, _MAX_RETRIES + 1):
-        with cf.ThreadPoolExecutor(max_workers=len(mirrors)) as ex:
-            futs = []
-            for url in mirrors:
-                api = overpy.Overpass(url=url)
-                futs.append(ex.submit(lambda a=api: _paced_call(lambda: a.query(q))))
-            for fut in cf.as_completed(futs, timeout=60):
+        won, sent = threading.Event(), threading.Event()
+        futs = [_EXEC.submit(_paced_call, url, partial(_api(url).query, q), won, sent) for url in mirrors]
+        # The timeout covers the request itself, not the wait for a slot,
+        # the mirror's pacing or a token before it goes out.
+        while not sent.wait(0.25) and not all(f.done() for f in futs):
+            pass
+        try:
+            for fut in cf.as_completed(futs, timeout=_QUERY_TIMEOUT_S):
                 try:
-                    return fut.result()
+                    res = fut.result()
                 except Exception:
-                    pass
+                    continue
+                # First answer wins: drop queued losers and keep waiting ones
+                # from spending a request on the remote.
+                won.set()
+                for other in futs:
+                    other.cancel()
+                return res
+        except cf.TimeoutError:
+            pass  # no mirror answered in time: a failed attempt, retried below
+        finally:
+            won.set()  # nothing left should start, even after a timeout
         time.sleep(backoff)
         backoff = min(backoff * 1.8, 12.0)
 
@@ -3,48 +3,136 @@ from planetary_computer import sign
 from rasterio.windows import from_bounds
 from rasterio.enums import Resampling
 from rasterio.warp import transform_bounds
+import os
+import threading
+from functools import lru_cache
 import rasterio, numpy as np
+from cachetools import LRUCache, cached
 
-def read_rgbn_window(lat, lon, radius_deg=0.0075, max_size=384):  # smaller than before
-    lon_min, lat_min = lon - radius_deg, lat - radius_deg
-    lon_max, lat_max = lon + radius_deg, lat + radius_deg
+from ._ndvi_kernel import ndvi_counts as _ndvi_counts_jit
+
+# Remote COG reads: skip the sidecar directory listing, only allow .tif
+# range-GETs, keep fetched blocks in GDAL's VSI cache and multiplex the
+# range-GETs over HTTP/2.  setdefault so the deployment environment can
+# still override them.
+for _k, _v in (
+    ("GDAL_DISABLE_READDIR_ON_OPEN", "EMPTY_DIR"),
+    ("CPL_VSIL_CURL_ALLOWED_EXTENSIONS", ".tif"),
+    ("VSI_CACHE", "TRUE"),
+    ("GDAL_HTTP_VERSION", "2"),
+    ("GDAL_HTTP_MULTIPLEX", "YES"),
+):
+    os.environ.setdefault(_k, _v)
 
-    catalog = Client.open("https://planetarycomputer.microsoft.com/api/stac/v1")
-    search = catalog.search(
+
+def _overview_level(factors, decim: float):
+    """Index of the coarsest overview no coarser than ``decim``, or None for full resolution."""
+    level = None
+    for i, factor in enumerate(factors):
+        if factor <= decim:
+            level = i
+    return level
+
+
+def _read_bbox(src, bbox_ds, out_h: int, out_w: int) -> np.ndarray:
+    return src.read(
+        indexes=[1,2,3,4],
+        window=from_bounds(*bbox_ds, transform=src.transform),
+        out_shape=(4, out_h, out_w),
+        resampling=Resampling.bilinear,
+        boundless=True,
+    )
+
+STAC_URL = "https://planetarycomputer.microsoft.com/api/stac/v1"
+
+
+@lru_cache(maxsize=1)
+def _catalog() -> Client:
+    # Opened on first use (not at import) and reused: Client.open fetches the root catalog.
+    return Client.open(STAC_URL)
+
+
+@lru_cache(maxsize=4096)
+def _find_naip_item(qlat: float, qlon: float, radius_deg: float):
+    """Most relevant NAIP item around the (rounded) point, or None; memoized per ~100 m cell."""
+    search = _catalog().search(
         collections=["naip"],
-        bbox=[lon_min, lat_min, lon_max, lat_max],
+        bbox=[qlon - radius_deg, qlat - radius_deg, qlon + radius_deg, qlat + radius_deg],
         datetime="2015-01-01/2025-12-31",
         limit=1,
     )
-    items = list(search.items())  # was get_items()
+    return next(iter(search.items()), None)
+
 
-    if not items:
+@cached(LRUCache(maxsize=4096), key=lambda item_id, href: item_id, lock=threading.Lock())
+def _cog_meta(item_id: str, href: str):
+    """``(crs, transform, overview factors)`` of an item's COG, read once per item (the href's signature varies)."""
+    with rasterio.open(href) as src:
+        return src.crs, src.transform, tuple(src.overviews(1))
+
+
+def read_rgbn_window(lat, lon, radius_deg=0.0075, max_size=384):  # smaller than before
+    lon_min, lat_min = lon - radius_deg, lat - radius_deg
+    lon_max, lat_max = lon + radius_deg, lat + radius_deg
+
+    item = _find_naip_item(round(lat, 3), round(lon, 3), radius_deg)
+    if item is None:
         return None, None, {"error": "No NAIP imagery found."}
 
-    item = items[0]
+    # Signed per call: the SAS token expires, the item does not.
     href = sign(item.assets["image"]).href
 
-    with rasterio.open(href) as src:
-        bbox_ds = transform_bounds("EPSG:4326", src.crs, lon_min, lat_min, lon_max, lat_max, densify_pts=21)
-        win = from_bounds(*bbox_ds, transform=src.transform)
-
-        w, h = int(win.width), int(win.height)
-        scale = min(max_size / max(w, h), 1.0)
-        out_w, out_h = max(1, int(w*scale)), max(1, int(h*scale))
-
-        arr = src.read(
-            indexes=[1,2,3,4],
-            window=win,
-            out_shape=(4, out_h, out_w),
-            resampling=Resampling.bilinear,
-            boundless=True,
-        )
+    # Header facts come from the per-item cache, so only the dataset that is
+    # actually read gets opened.
+    crs, transform, factors = _cog_meta(item.id, href)
+    bbox_ds = transform_bounds("EPSG:4326", crs, lon_min, lat_min, lon_max, lat_max, densify_pts=21)
+    win = from_bounds(*bbox_ds, transform=transform)
+
+    w, h = int(win.width), int(win.height)
+    scale = min(max_size / max(w, h), 1.0)
+    out_w, out_h = max(1, int(w*scale)), max(1, int(h*scale))
+
+    # Read from the closest pre-decimated overview (if any) so only its (much
+    # smaller) tiles are fetched; the final resample is then minor.
+    level = _overview_level(factors, 1.0 / scale)
+    with rasterio.open(href, **({} if level is None else {"overview_level": level})) as src:
+        arr = _read_bbox(src, bbox_ds, out_h, out_w)
     return arr, item, None
 
 def compute_ndvi(arr: np.ndarray) -> np.ndarray:
     """
     Compute the Normalized Difference Vegetation Index (NDVI) from an RGB+NIR array.
     """
-    red = arr[0].astype(np.float32)
-    nir = arr[3].astype(np.float32)
-    return (nir - red) / (nir + red + 1e-5)
\ No newline at end of file
+    # Same float32 arithmetic as (nir - red) / (nir + red + 1e-5), but the bands
+    # are cast inside the ufuncs and results land in two preallocated buffers
+    # instead of five temporaries.
+    red, nir = arr[0], arr[3]
+    out = np.subtract(nir, red, dtype=np.float32)
+    denom = np.add(nir, red, dtype=np.float32)
+    denom += np.float32(1e-5)
+    out /= denom
+    return out
+
+
+def ndvi_masks(arr: np.ndarray, pav_thr: float = 0.1, veg_thr: float = 0.4):
+    """
+    Count pavement (NDVI < ``pav_thr``) and canopy (NDVI > ``veg_thr``) pixels.
+
+    Returns ``(pavement_count, canopy_count, total)`` with the same counts
+    as thresholding ``compute_ndvi(arr)``, but compares ``nir - red``
+    against ``thr * (nir + red + 1e-5)`` (the denominator is always
+    positive) so no NDVI array or per-pixel division is needed.  With
+    numba installed the count is one parallel compiled pass.
+    """
+    if _ndvi_counts_jit is not None:
+        pavement, canopy = _ndvi_counts_jit(arr, pav_thr, veg_thr)
+        return int(pavement), int(canopy), arr[0].size
+    red, nir = arr[0], arr[3]
+    num = np.subtract(nir, red, dtype=np.float32)
+    den = np.add(nir, red, dtype=np.float32)
+    den += np.float32(1e-5)
+    bound = np.multiply(den, np.float32(pav_thr))
+    pavement = int(np.count_nonzero(num < bound))
+    np.multiply(den, np.float32(veg_thr), out=bound)
+    canopy = int(np.count_nonzero(num > bound))
+    return pavement, canopy, num.size
@@ -18,8 +18,12 @@ returns an error, the module gracefully reports the issue.
 
 from __future__ import annotations
 
-import requests
-from typing import Dict, Any
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import Dict, Any, List
+
+from .http_session import SESSION
 
 # ---- TTL cache (fallback if shared cache not available) --------------------
 try:
@@ -31,6 +35,13 @@ except Exception:
             return fn
         return deco
 
+FEET_LEVELS = (1, 2, 3, 4, 5, 6)
+# A scenario query still running after this long gets a duplicate request;
+# whichever answers first is used.
+SLR_HEDGE_AFTER_S = float(os.getenv("SLR_HEDGE_AFTER_S", "0.8"))
+# One slot per scenario plus one per possible hedge.
+_POOL = ThreadPoolExecutor(max_workers=2 * len(FEET_LEVELS), thread_name_prefix="slr")
+
 
 def _query_inundation(lat: float, lon: float, feet: int, radius_m: int = 5000) -> bool:
     """
@@ -71,7 +82,7 @@ def _query_inundation(lat: float, lon: float, feet: int, radius_m: int = 5000) -
         "f": "json",
     }
     try:
-        resp = requests.get(base_url, params=params, timeout=20)
+        resp = SESSION.get(base_url, params=params, timeout=20)
     except Exception:
         # If the request fails (network/proxy issues) treat as unknown.
         return None
@@ -87,6 +98,25 @@ def _query_inundation(lat: float, lon: float, feet: int, radius_m: int = 5000) -
     return False
 
 
+def _started_query(started: threading.Event, lat: float, lon: float, feet: int) -> bool:
+    # Marks the attempt as running, so a slow query can be told from a queued one.
+    started.set()
+    return _query_inundation(lat, lon, feet)
+
+
+def _first_answer(futs) -> Any:
+    """First non-None result among ``futs`` (None if every attempt failed); cancels the rest."""
+    try:
+        for fut in as_completed(futs):
+            hit = fut.result()
+            if hit is not None:
+                return hit
+        return None
+    finally:
+        for fut in futs:
+            fut.cancel()
+
+
 @ttl_cache(seconds=24 * 3600)  # cache for one day
 def get_sea_level_rise_score(lat: float, lon: float) -> Dict[str, Any]:
     """
@@ -113,16 +143,23 @@ def get_sea_level_rise_score(lat: float, lon: float) -> Dict[str, Any]:
         completely, the ``score`` will still be computed based on
         available results but ``inundated_feet`` entries may be ``None``.
     """
-    feet_levels = [1, 2, 3, 4, 5, 6]
+    # The six scenario layers are independent: query them concurrently, then
+    # hedge whichever are still outstanding after SLR_HEDGE_AFTER_S.
+    started = {ft: threading.Event() for ft in FEET_LEVELS}
+    attempts = {ft: [_POOL.submit(_started_query, started[ft], lat, lon, ft)] for ft in FEET_LEVELS}
+    wait([futs[0] for futs in attempts.values()], timeout=SLR_HEDGE_AFTER_S)
+    for ft, futs in attempts.items():
+        # Only hedge requests that are actually slow: one still queued behind
+        # a busy pool would only queue its duplicate as well.
+        if started[ft].is_set() and not futs[0].done():
+            futs.append(_POOL.submit(_query_inundation, lat, lon, ft))
     inundated: Dict[str, Any] = {}
-    risk_count = 0
-    for ft in feet_levels:
-        hit = _query_inundation(lat, lon, ft)
+    true_levels: List[int] = []
+    for ft, futs in attempts.items():
+        hit = _first_answer(futs)
         inundated[str(ft)] = hit
-        if hit:
-            risk_count += 1
-
-    true_levels = [int(ft) for ft, hit in ((k, v) for k, v in inundated.items()) if hit is True]
+        if hit is True:
+            true_levels.append(ft)
 
     if not true_levels:
         score = 100  
@@ -9,17 +9,41 @@ Responses are cached for one day.
 
 from __future__ import annotations
 import math
-from math import radians, sin, cos, sqrt, atan2
-import requests
+import numpy as np
+import orjson
 from typing import Dict, Any, Optional
 from .cache import ttl_cache
+from .http_session import SESSION
 
-def _haversine_distance_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+def _haversine_distance_miles(lat1: float, lon1: float, lats2: np.ndarray, lons2: np.ndarray) -> np.ndarray:
+    """Distances in miles from (lat1, lon1) to each of (lats2, lons2)."""
     R = 3958.8  # Earth radius in miles
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-    return 2 * R * atan2(sqrt(a), sqrt(1 - a))
+    phi1, phi2 = np.radians(lat1), np.radians(lats2)
+    dlat = phi2 - phi1
+    dlon = np.radians(lons2 - lon1)
+    a = np.sin(dlat / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlon / 2) ** 2
+    return 2 * R * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _nearest_miles(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray, radius_miles: float) -> float:
+    """Distance to the closest of (lats, lons); only candidates in the radius bounding box are measured if one is in range."""
+    # Anything outside this (slightly generous) box is farther than radius_miles.
+    max_dlat = radius_miles / 68.0
+    cos_edge = math.cos(math.radians(min(89.0, abs(lat) + max_dlat)))
+    max_dlon = radius_miles / (68.0 * cos_edge)
+    box = (np.abs(lats - lat) <= max_dlat) & (np.abs(lons - lon) <= max_dlon)
+    if box.any():
+        best = float(_haversine_distance_miles(lat, lon, lats[box], lons[box]).min())
+        if best <= radius_miles:
+            return best
+    return float(_haversine_distance_miles(lat, lon, lats, lons).min())
+
+
+def _coord(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
 
 def normalize_toxic_sites(num_sites: int, nearest_distance: float) -> int:
     n = max(0, int(num_sites))
@@ -67,30 +91,23 @@ def get_toxic_sites(lat: float, lon: float, radius_miles: float = 5.0) -> Dict[s
         "program_output": "N"
     }
     try:
-        resp = requests.get(url, params=params, timeout=60)
+        resp = SESSION.get(url, params=params, timeout=60)
     except Exception as e:
         return {"error": f"EPA FRS request failed: {e}"}
     if resp.status_code != 200:
         return {"error": f"EPA FRS API returned {resp.status_code}"}
     try:
-        data = resp.json().get("Results", {}).get("FRSFacility", [])
+        data = orjson.loads(resp.content).get("Results", {}).get("FRSFacility", [])
     except Exception as e:
         return {"error": f"Failed to parse EPA FRS response: {e}"}
     if not data:
         return {"score": 100, "num_sites": 0, "nearest_distance_miles": None}
-    count = 0
-    nearest: Optional[float] = None
-    for fac in data:
-        lat2, lon2 = fac.get("Latitude83"), fac.get("Longitude83")
-        if lat2 is None or lon2 is None:
-            continue
-        try:
-            dist = _haversine_distance_miles(lat, lon, float(lat2), float(lon2))
-        except Exception:
-            continue
-        count += 1
-        if nearest is None or dist < nearest:
-            nearest = dist
+    # Facilities without usable coordinates are dropped before the distance pass.
+    lats = np.fromiter((_coord(fac.get("Latitude83")) for fac in data), dtype=np.float64, count=len(data))
+    lons = np.fromiter((_coord(fac.get("Longitude83")) for fac in data), dtype=np.float64, count=len(data))
+    ok = ~(np.isnan(lats) | np.isnan(lons))
+    count = int(np.count_nonzero(ok))
+    nearest: Optional[float] = _nearest_miles(lat, lon, lats[ok], lons[ok], radius_miles) if count else None
     if nearest is None:
         nearest = radius_miles
     return {
@@ -2,39 +2,8 @@ from __future__ import annotations
 import os
 import math
 from typing import Dict, Any
-from utils.overpass_throttle import hedged_paced_query as paced_query
-import overpy
-import math
-
-
-# ---- Throttle helper (fallback if not present) -------------------------------
-try:
-    from .overpass_throttle import paced_query  # preferred (shared across modules)
-except Exception:
-    import time, threading
-    _LOCK = threading.Lock()
-    _LAST = 0.0
-    _MIN_INTERVAL_S = float(os.getenv("OVERPASS_MIN_INTERVAL_S", "2.5"))
-    _MAX_RETRIES = int(os.getenv("OVERPASS_MAX_RETRIES", "6"))
-
-    def paced_query(api: overpy.Overpass, q: str):
-        """Serialize Overpass calls with a minimal delay; simple retry loop."""
-        global _LAST
-        backoff = 2.0
-        for _ in range(_MAX_RETRIES):
-            with _LOCK:
-                wait = _MIN_INTERVAL_S - (time.monotonic() - _LAST)
-                if wait > 0:
-                    time.sleep(wait)
-                try:
-                    res = api.query(q)
-                    _LAST = time.monotonic()
-                    return res
-                except Exception:
-                    pass
-            time.sleep(backoff)
-            backoff = min(backoff * 1.8, 30.0)
-        raise overpy.exception.OverpassTooManyRequests("Overpass failed after retries")
+import numpy as np
+from .overpass_throttle import hedged_paced_query as paced_query
 
 # ---- TTL cache (fallback if not present) -------------------------------------
 try:
@@ -45,13 +14,6 @@ except Exception:
             return fn
         return deco
 
-# ---- Overpass client ---------------------------------------------------------
-OVERPASS_URL = os.getenv("OVERPASS_URL")  # e.g. https://overpass.kumi.systems/api/interpreter
-if OVERPASS_URL:
-    API = overpy.Overpass(url=OVERPASS_URL)
-else:
-    API = overpy.Overpass()
-
 # ---- Heuristics --------------------------------------------------------------
 def get_population_estimate(zip_code: str) -> int:
     # keep deterministic/cheap; adjust if you wire a real source
@@ -76,37 +38,51 @@ ROAD_WEIGHTS = {
 }
 
 # ---- Core calc ---------------------------------------------------------------
+# 'out tags geom' returns each way's highway tag and vertices in the same response
+# (no extra calls, no node/meta payload); 'qt' skips the server-side id sort.
+_Q_TEMPLATE = '[out:json][timeout:180];way(around:{r},{la},{lo})["highway"];out tags geom qt;'
+
+def _latlon(pt):
+    # geometry can be dicts or objects with lat/lon attrs depending on overpy version
+    if isinstance(pt, dict):
+        return float(pt["lat"]), float(pt["lon"])
+    return float(getattr(pt, "lat")), float(getattr(pt, "lon"))
+
+def _way_lengths_m(geoms, cos_lat: float) -> np.ndarray:
+    """Polyline length of each way in metres (equirectangular at ``cos_lat``, one vectorized pass)."""
+    counts = np.fromiter((len(g) for g in geoms), dtype=np.intp, count=len(geoms))
+    n = int(counts.sum())
+    pts = np.fromiter((c for g in geoms for pt in g for c in _latlon(pt)), dtype=np.float64, count=2 * n).reshape(n, 2)
+    lat, lon = pts[:, 0], pts[:, 1]
+    dy = np.diff(lat)
+    dx = np.diff(lon) * cos_lat
+    seg = np.hypot(dy, dx) * 111000.0  # rough meters
+    starts = np.cumsum(counts) - counts
+    seg[starts[1:] - 1] = 0.0  # the "segment" joining one way's last point to the next way's first
+    return np.add.reduceat(seg, starts)
+
 def _compute_total_road_length(lat: float, lon: float, radius_m: int = 1000) -> Dict[str, Any]:
-    # 'out geom' returns per-way geometry points in the same response (no extra calls)
-    q = f"""
-    [out:json][timeout:180];
-    way(around:{radius_m},{lat},{lon})["highway"];
-    out geom tags;
-    """
-    result = paced_query(API, q)
+    q = _Q_TEMPLATE.format_map({"r": radius_m, "la": lat, "lo": lon})
+    result = paced_query(q)
 
     total_weighted_length = 0.0
     raw_lengths: Dict[str, float] = {}
 
+    types, geoms = [], []
     for way in result.ways:
         road_type = way.tags.get("highway", "unknown")
         geom = getattr(way, "geometry", None)
         if road_type == "unknown" or not geom or len(geom) < 2:
             continue
+        types.append(road_type)
+        geoms.append(geom)
+    if not geoms:
+        return {"weighted_length": total_weighted_length, "raw_road_lengths": raw_lengths}
 
-        # geometry can be dicts or objects with lat/lon attrs depending on overpy version
-        def _latlon(pt):
-            if isinstance(pt, dict):
-                return float(pt["lat"]), float(pt["lon"])
-            return float(getattr(pt, "lat")), float(getattr(pt, "lon"))
-
-        length_m = 0.0
-        for i in range(1, len(geom)):
-            y1, x1 = _latlon(geom[i - 1])
-            y2, x2 = _latlon(geom[i])
-            dy, dx = (y2 - y1), (x2 - x1)
-            length_m += ((dy * dy + dx * dx) ** 0.5) * 111000.0  # rough meters
+    # Every way lies within radius_m of the query point, so one cos(lat) is enough.
+    cos_lat = math.cos(math.radians(lat))
 
+    for road_type, length_m in zip(types, _way_lengths_m(geoms, cos_lat).tolist()):
         weight = ROAD_WEIGHTS.get(road_type, 0.1)
         total_weighted_length += length_m * weight
         raw_lengths[road_type] = raw_lengths.get(road_type, 0.0) + length_m
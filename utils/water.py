@@ -17,34 +17,125 @@ If the query fails, an error is returned.
 from __future__ import annotations
 
 import math
-from typing import Dict, Any
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 
-# Try to import overpy; if missing, we'll fall back to a direct HTTP
-# request to the Overpass API.  This mirrors the approach used by the
-# transit module.
-try:
-    import overpy  # type: ignore
-    _OVERPY_AVAILABLE = True
-except Exception:
-    overpy = None  # type: ignore
-    _OVERPY_AVAILABLE = False
+import numpy as np
+from cachetools import TTLCache
+
+from .osm_counts import overpass_counts
+from .water_local import count_water_features
+
+# get_water_scores sends at most this many points per Overpass query; larger
+# batches are split and the chunks run concurrently over HTTP/2.
+WATER_BATCH_SIZE = int(os.getenv("WATER_BATCH_SIZE", "100"))
+_BATCH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="water-batch")
+
+# Largest radius known to contain no water features, per exact point: any
+# smaller circle around the same point is empty too, so it needs no query.
+_NULL_RADIUS: "TTLCache[Tuple[float, float], int]" = TTLCache(maxsize=16_384, ttl=7 * 24 * 3600)
+_null_lock = threading.Lock()
+
+
+def _note_empty(lat: float, lon: float, radius_m: int) -> None:
+    with _null_lock:
+        if radius_m > _NULL_RADIUS.get((lat, lon), 0):
+            _NULL_RADIUS[(lat, lon)] = radius_m
+
+# Single-flight: concurrent misses for the same (~11 m) point and radius wait
+# on the first caller's Overpass query instead of issuing their own.
+_INFLIGHT: Dict[Tuple[float, float, int], Future] = {}
+_inflight_lock = threading.Lock()
 
+# ---- TTL cache (fallback if no shared cache) -------------------------------
 try:
-    from overpass_throttle import hedged_paced_query as paced_query  # type: ignore
+    from .cache import is_cacheable, ttl_cache  # type: ignore
 except Exception:
-    paced_query = None  # type: ignore
+    def is_cacheable(result) -> bool:  # type: ignore
+        return True
+
+    def ttl_cache(seconds: int = 3600, maxsize: int = 1024, should_cache=None):  # type: ignore
+        def deco(fn):  # type: ignore
+            return fn
+        return deco
 
-# ---- TTL cache (fallback if no shared cache) -------------------------------
 try:
-    from .cache import ttl_cache  # type: ignore
+    from .cache import redis_ttl_cache  # type: ignore
 except Exception:
-    def ttl_cache(seconds: int = 3600):  # type: ignore
+    def redis_ttl_cache(prefix: str, seconds: int = 3600, quantize=None):  # type: ignore
         def deco(fn):  # type: ignore
             return fn
         return deco
 
 
-@ttl_cache(seconds=7 * 24 * 3600)  # one week
+# Natural water bodies and riverbank features.  We query for ways
+# (polygons/lines) because water areas are usually represented as ways or
+# relations, plus multipolygon relations with natural=water.  ``out count``
+# makes Overpass tally the matches server-side and return one small row of
+# tallies instead of every id.
+_Q_TEMPLATE = (
+    "("
+    "way(around:{r},{la},{lo})[natural=water];"
+    "relation(around:{r},{la},{lo})[type=multipolygon][natural=water];"
+    "way(around:{r},{la},{lo})[waterway=riverbank];"
+    ");out count;"
+)
+
+
+def _water_query_fragment(lat: float, lon: float, radius_m: int) -> str:
+    return _Q_TEMPLATE.format_map({"r": radius_m, "la": lat, "lo": lon})
+
+
+@lru_cache(maxsize=32)
+def _area_km2(radius_m: int) -> float:
+    return math.pi * (radius_m / 1000.0) ** 2
+
+
+def _water_score_formula(water_count: int, radius_m: int) -> int:
+    # If no features, clearly 0.
+    if water_count == 0:
+        return 0
+    area_km2 = _area_km2(radius_m)
+    density = water_count / area_km2  # features / km²
+    alpha = 0.45
+    return int(round(100.0 * (1.0 - math.exp(-alpha * density))))
+
+
+# Scores for 0..256 features at the default 1 km radius, so the common case
+# is an index instead of an exp().
+_LUT_RADIUS_M = 1000
+_SCORE_LUT = np.array([_water_score_formula(n, _LUT_RADIUS_M) for n in range(257)], dtype=np.int64)
+
+
+def _water_score(water_count: int, radius_m: int) -> int:
+    if radius_m == _LUT_RADIUS_M and 0 <= water_count < len(_SCORE_LUT):
+        return int(_SCORE_LUT[water_count])
+    return _water_score_formula(water_count, radius_m)
+
+
+# Count ways and relations representing water features.  We intentionally
+# skip nodes since water bodies are not single points.
+_WATER_KINDS = ("ways", "relations")
+
+
+def _water_count(tags: Dict[str, str]) -> int:
+    return sum(int(tags.get(kind, 0)) for kind in _WATER_KINDS)
+
+
+def _water_result(tags: Dict[str, str], radius_m: int) -> Dict[str, Any]:
+    water_count = _water_count(tags)
+    return {
+        "score": _water_score(water_count, radius_m),
+        "water_features": water_count,
+        "source": "OSM via Overpass API",
+    }
+
+
+@ttl_cache(seconds=7 * 24 * 3600, should_cache=is_cacheable)  # one week; errors are retried
+@redis_ttl_cache("water", 7 * 24 * 3600, quantize={"lat": 3, "lon": 3})  # L2: survives restarts, ~100 m cells
 def get_water_score(lat: float, lon: float, radius_m: int = 1000) -> Dict[str, Any]:
     """
     Compute a water availability score for a location.
@@ -70,73 +161,113 @@ def get_water_score(lat: float, lon: float, radius_m: int = 1000) -> Dict[str, A
         ``source`` (str).  If the Overpass query fails, returns
         ``error`` instead of a score.
     """
-    # Build an Overpass query that searches for natural water bodies and
-    # riverbank features.  We query for ways (polygons/lines) because
-    # water areas are usually represented as ways or relations.  We
-    # also include multipolygon relations with natural=water tags.
-    query = f"""
-    [out:json][timeout:60];
-    (
-      way(around:{radius_m},{lat},{lon})[natural=water];
-      relation(around:{radius_m},{lat},{lon})[type=multipolygon][natural=water];
-      way(around:{radius_m},{lat},{lon})[waterway=riverbank];
-    );
-    out ids;
+    result = _water_shortcut(lat, lon, radius_m)
+    if result is not None:
+        return result
+    key, fut, leader = _join_water_query(lat, lon, radius_m)
+    if not leader:
+        return fut.result()
+    try:
+        result = _query_water(lat, lon, radius_m)
+    except BaseException as exc:
+        _finish_water_query(key, fut, exc=exc)
+        raise
+    _finish_water_query(key, fut, result)
+    return result
+
+
+def _water_shortcut(lat: float, lon: float, radius_m: int) -> Optional[Dict[str, Any]]:
+    """The result if it needs no Overpass query (known-empty circle or local extract), else None."""
+    with _null_lock:
+        known_empty = radius_m <= _NULL_RADIUS.get((lat, lon), 0)
+    if known_empty:
+        return _water_result({}, radius_m)
+
+    # A configured local extract covering the whole circle answers without Overpass.
+    local_count = count_water_features(lat, lon, radius_m)
+    if local_count is not None:
+        return {
+            "score": _water_score(local_count, radius_m),
+            "water_features": local_count,
+            "source": "OSM extract (local index)",
+        }
+    return None
+
+
+def _join_water_query(lat: float, lon: float, radius_m: int) -> Tuple[Tuple[float, float, int], Future, bool]:
     """
-    # If overpy is available along with the paced_query helper, use it
-    if _OVERPY_AVAILABLE and paced_query is not None:
-        try:
-            result = paced_query(query)  # type: ignore
-        except Exception as exc:
-            return {"error": f"Overpass query failed: {exc}"}
-        # Count unique IDs across ways and relations.  Overpy stores ways and
-        # relations separately.  We ignore nodes because nodes cannot
-        # represent water areas alone.
-        water_count = 0
-        water_count += len(getattr(result, "ways", []))
-        water_count += len(getattr(result, "relations", []))
-    else:
-        # Fall back to direct HTTP query to Overpass API.
-        import requests
-        overpass_urls = [
-            "https://overpass.kumi.systems/api/interpreter",
-            "https://z.overpass-api.de/api/interpreter",
-            "https://overpass-api.de/api/interpreter",
-        ]
-        response = None
-        for url in overpass_urls:
-            try:
-                response = requests.post(url, data={"data": query}, timeout=60)
-                if response.status_code == 200:
-                    break
-            except Exception:
-                response = None
-        if response is None or response.status_code != 200:
-            return {"error": "Overpass query failed or no suitable endpoint responded"}
-        try:
-            data = response.json()
-        except Exception as exc:
-            return {"error": f"Failed to parse Overpass response: {exc}"}
-        # Count ways and relations representing water features.  We
-        # intentionally skip nodes since water bodies are not single
-        # points.
-        water_count = 0
-        for element in data.get("elements", []):
-            t = element.get("type")
-            if t == "way" or t == "relation":
-                water_count += 1
+    Single-flight slot for a water query: ``(key, future, leader)``.  The
+    leader runs the query and hands its result to ``_finish_water_query``;
+    everyone else waits on ``future``.
+    """
+    key = (round(lat, 4), round(lon, 4), radius_m)
+    with _inflight_lock:
+        fut = _INFLIGHT.get(key)
+        leader = fut is None
+        if leader:
+            fut = _INFLIGHT[key] = Future()
+    return key, fut, leader
 
-    # If no features, clearly 0.
-    if water_count == 0:
-        score = 0
+
+def _finish_water_query(key: Tuple[float, float, int], fut: Future,
+                        result: Optional[Dict[str, Any]] = None, exc: Optional[BaseException] = None) -> None:
+    if exc is not None:
+        fut.set_exception(exc)
     else:
-        area_km2 = math.pi * (radius_m / 1000.0) ** 2
-        density = water_count / area_km2  # features / km²
-        alpha = 0.45
-        score = int(round(100.0 * (1.0 - math.exp(-alpha * density))))
+        fut.set_result(result)
+    with _inflight_lock:
+        _INFLIGHT.pop(key, None)
 
-    return {
-        "score": score,
-        "water_features": water_count,
-        "source": "OSM via Overpass API",
-    }
\ No newline at end of file
+
+def _water_answer(lat: float, lon: float, radius_m: int, tags: Dict[str, str]) -> Dict[str, Any]:
+    """Score one point's tallies, remembering the circle if it is empty."""
+    result = _water_result(tags, radius_m)
+    if result["water_features"] == 0:
+        _note_empty(lat, lon, radius_m)
+    return result
+
+
+def _query_water(lat: float, lon: float, radius_m: int) -> Dict[str, Any]:
+    tags, err = overpass_counts([_water_query_fragment(lat, lon, radius_m)])
+    if err:
+        return {"error": err}
+    return _water_answer(lat, lon, radius_m, tags[0])
+
+
+def get_water_scores(coords: Sequence[Tuple[float, float]], radius_m: int = 1000) -> List[Dict[str, Any]]:
+    """
+    ``get_water_score`` for many points with batched Overpass requests.
+
+    One ``out count`` fragment per point is sent in one query (one per
+    ``WATER_BATCH_SIZE`` points, issued concurrently over HTTP/2), the
+    ordered tallies are read back and all points are scored in one
+    NumPy pass.  Results are in input order; points whose query failed
+    get an ``{"error": ...}`` dict.
+    """
+    pts = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if not len(pts):
+        return []
+    fragments = [_water_query_fragment(lat, lon, radius_m) for lat, lon in pts.tolist()]
+    chunks = [fragments[i:i + WATER_BATCH_SIZE] for i in range(0, len(fragments), WATER_BATCH_SIZE)]
+    tags: List[Dict[str, str]] = []
+    failed: Dict[int, str] = {}  # point index -> error
+    for chunk, (chunk_tags, err) in zip(chunks, _BATCH_POOL.map(lambda c: overpass_counts(c, http2=True), chunks)):
+        if err:
+            failed.update((len(tags) + i, err) for i in range(len(chunk)))
+            chunk_tags = [{}] * len(chunk)
+        tags.extend(chunk_tags)
+
+    counts = np.fromiter((_water_count(t) for t in tags), dtype=np.int64, count=len(tags))
+    for i in np.flatnonzero(counts == 0).tolist():
+        if i not in failed:
+            _note_empty(*pts[i].tolist(), radius_m)
+    if radius_m == _LUT_RADIUS_M and counts.max() < len(_SCORE_LUT):
+        scores = _SCORE_LUT[counts]
+    else:
+        density = counts / _area_km2(radius_m)  # features / km²
+        scores = np.rint(100.0 * (1.0 - np.exp(-0.45 * density))).astype(np.int64)
+    return [
+        {"error": failed[i]} if i in failed else
+        {"score": score, "water_features": count, "source": "OSM via Overpass API"}
+        for i, (score, count) in enumerate(zip(scores.tolist(), counts.tolist()))
+    ]